@@ -0,0 +1,138 @@
+"""
+This module contains the feels backup engine.
+
+Backups are gzipped tarballs of the entries directory, written with tarfile in
+one streaming pass: each entry is read once, hashed, and added to the archive
+straight away, so only one entry is ever held in memory. The size, mtime and
+hash of every entry that went into a backup is kept in a backup manifest, so
+an incremental backup can pick out just the entries that changed since the
+last one.
+
+The copy kept in ~/.ttbp/backups is a hard link to the archive in the user's
+home directory (or a symlink, if the two aren't on the same filesystem), so a
+backup only takes up space once.
+"""
+import hashlib
+import io
+import json
+import os
+import tarfile
+import time
+
+from . import config
+from . import fsops
+from . import scanner
+from . import util
+
+def load_manifest():
+    '''
+    returns the backup manifest as a dict of entry filename to
+    [size, mtime, hash], or an empty dict if there hasn't been a backup yet
+    '''
+
+    try:
+        with open(config.BACKUP_MANIFEST, "r") as manifest:
+            return json.load(manifest).get("entries", {})
+    except (IOError, OSError, ValueError):
+        return {}
+
+def save_manifest(records):
+    '''
+    writes the backup manifest
+    '''
+
+    util.write_atomic(config.BACKUP_MANIFEST, [json.dumps({"entries": records})])
+
+def backup_name(incremental=False):
+    '''
+    returns a filename for a new backup archive
+    '''
+
+    if incremental:
+        return "feels-backup-"+time.strftime("%Y%m%d-%H%M%S")+"-incremental.tar.gz"
+
+    return "feels-backup-"+time.strftime("%Y%m%d-%H%M%S")+".tar.gz"
+
+def create(archive, incremental=False):
+    '''
+    writes a backup of the entries directory to the given archive path
+
+    * a full backup has every entry; an incremental one only has entries that
+      are new or changed since the last backup manifest
+    * an entry only gets read (and hashed) if it's going into the archive or
+      its size or mtime has moved since the manifest
+    * returns the number of entries backed up, or None if the archive
+      couldn't be written; an incremental backup with nothing new doesn't
+      write an archive and returns 0
+    '''
+
+    old = {}
+    if incremental:
+        old = load_manifest()
+
+    records = {}
+    count = 0
+
+    try:
+        handle = os.open(archive, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(handle, "wb") as fileobj:
+            with tarfile.open(fileobj=fileobj, mode="w:gz") as tar:
+                tar.add(config.MAIN_FEELS, arcname="entries", recursive=False)
+
+                for entry in scanner.entries(config.MAIN_FEELS):
+                    size, mtime = entry.stat.st_size, entry.stat.st_mtime
+                    record = old.get(entry.name)
+
+                    if record and record[0] == size and record[1] == mtime:
+                        records[entry.name] = record
+                        continue
+
+                    try:
+                        with open(entry.path, "rb") as feel:
+                            data = feel.read()
+                    except (IOError, OSError):
+                        continue
+
+                    digest = hashlib.sha256(data).hexdigest()
+                    records[entry.name] = [size, mtime, digest]
+
+                    if record and record[2] == digest:
+                        continue
+
+                    info = tar.gettarinfo(entry.path, arcname="entries/"+entry.name)
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+                    count += 1
+    except (OSError, tarfile.TarError) as error:
+        fsops.report("archive", archive, error)
+        if os.path.exists(archive):
+            fsops.remove(archive)
+        return None
+
+    if incremental and not count:
+        fsops.remove(archive)
+
+    save_manifest(records)
+
+    return count
+
+def keep(archive):
+    '''
+    puts a reference to the given archive in the backups directory: a hard
+    link if possible, otherwise a symlink
+
+    * returns the path of the reference, or None if neither worked
+    '''
+
+    if not fsops.ensure_dir(config.BACKUPS, 0o700):
+        return None
+
+    kept = os.path.join(config.BACKUPS, os.path.basename(archive))
+
+    try:
+        os.link(archive, kept)
+    except OSError:
+        if not fsops.symlink(archive, kept):
+            return None
+
+    return kept
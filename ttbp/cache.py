@@ -0,0 +1,123 @@
+"""
+This module contains the on-disk markdown render cache.
+
+Rendered entries are stored under ~/.ttbp/cache, named by a hash of the entry
+text, the mistune version, and the options it was rendered with, so a rebuild
+after a settings change, a header edit, or an upgrade can skip markdown work
+for any entry that hasn't changed. The cache is size-bounded; when it grows
+past CACHE_LIMIT, the least recently used renders are evicted.
+"""
+import hashlib
+import json
+import os
+
+import mistune
+
+from . import config
+from . import util
+
+MARKDOWN_OPTIONS = {"escape": False, "hard_wrap": False}
+CACHE_LIMIT = 16 * 1024 * 1024
+
+# running total of bytes in the cache directory; None until first scanned
+SIZE = None
+
+def cache_key(text):
+    '''
+    returns the cache filename for the given entry text
+    '''
+
+    key = hashlib.sha256()
+    key.update(mistune.__version__.encode("utf-8"))
+    key.update(json.dumps(MARKDOWN_OPTIONS, sort_keys=True).encode("utf-8"))
+    key.update(text.encode("utf-8"))
+
+    return key.hexdigest()+".html"
+
+def get(text):
+    '''
+    returns the cached render of the given entry text, or None on a miss
+
+    * a hit bumps the file's mtime, which is what eviction goes by
+    '''
+
+    path = os.path.join(config.RENDER_CACHE, cache_key(text))
+
+    try:
+        with open(path, "r") as cached:
+            html = cached.read()
+        os.utime(path, None)
+    except (IOError, OSError):
+        return None
+
+    return html
+
+def put(text, html):
+    '''
+    stores a render of the given entry text, evicting old renders if the cache
+    is over CACHE_LIMIT
+    '''
+
+    global SIZE
+
+    if SIZE is None:
+        scan()
+
+    path = os.path.join(config.RENDER_CACHE, cache_key(text))
+
+    try:
+        if not os.path.isdir(config.RENDER_CACHE):
+            os.mkdir(config.RENDER_CACHE)
+        util.write_atomic(path, [html])
+    except (IOError, OSError):
+        return
+
+    SIZE += os.path.getsize(path)
+
+    if SIZE > CACHE_LIMIT:
+        evict()
+
+def scan():
+    '''
+    returns a list of (mtime, size, path) for everything in the cache, oldest
+    first, and resets the running SIZE total
+    '''
+
+    global SIZE
+
+    renders = []
+
+    try:
+        filenames = os.listdir(config.RENDER_CACHE)
+    except OSError:
+        filenames = []
+
+    for filename in filenames:
+        path = os.path.join(config.RENDER_CACHE, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        renders.append((stat.st_mtime, stat.st_size, path))
+
+    renders.sort()
+    SIZE = sum(render[1] for render in renders)
+
+    return renders
+
+def evict(target=0.75):
+    '''
+    removes least recently used renders until the cache is under the given
+    fraction of CACHE_LIMIT
+    '''
+
+    global SIZE
+
+    for mtime, size, path in scan():
+        if SIZE <= CACHE_LIMIT * target:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        SIZE -= size
@@ -69,13 +69,19 @@ PATH = os.path.join(USER_HOME, '.ttbp')
 PUBLIC = os.path.join(USER_HOME, 'public_html')
 WWW = os.path.join(PATH, 'www')
 GOPHER_ENTRIES = os.path.join(PATH, 'gopher')
+GOPHER_SHARDS = os.path.join(PATH, 'gopher-shards')
 GOPHER_PATH = os.path.join(USER_HOME, 'public_gopher', 'feels')
 USER_CONFIG = os.path.join(PATH, 'config')
 TTBPRC = os.path.join(USER_CONFIG, 'ttbprc')
 MAIN_FEELS = os.path.join(PATH, 'entries')
 BURIED_FEELS = os.path.join(PATH, 'buried')
 NOPUB = os.path.join(USER_CONFIG, 'nopub')
+MANIFEST = os.path.join(PATH, 'manifest')
+LATEST = os.path.join(USER_CONFIG, 'latest')
+FEED_INDEX = os.path.join(USER_CONFIG, 'feed-index')
+RENDER_CACHE = os.path.join(PATH, 'cache')
 BACKUPS = os.path.join(PATH, 'backups')
+BACKUP_MANIFEST = os.path.join(PATH, 'backup-manifest')
 SUBS = os.path.join(USER_CONFIG, 'subs')
 
 ## UI
@@ -151,7 +157,8 @@ those files.
 (a buried feels browser is in the works; for now, you'll have to use the
 command line to view your buried feels)
 
-which day's feels do you want to bury?
+which day's feels do you want to bury? you can also bury a bunch at once by
+giving a month, a year, a range like 20160301-20160315, or a list of dates.
 
 YYYYMMDD (or 'q' to cancel)> """.format(buried_dir=BURIED_FEELS)
 
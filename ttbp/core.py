@@ -34,14 +34,24 @@ https://github.com/modgethanc/ttbp
 
 import os
 import time
-import subprocess
 import re
 import mistune
 import json
-
+import hashlib
+import tarfile
+import collections
+import contextlib
+import threading
+import zlib
+
+from . import cache
 from . import chatter
 from . import config
+from . import feed
+from . import fsops
 from . import gopher
+from . import publisher
+from . import scanner
 from . import util
 
 FEED = os.path.join("/home", "endorphant", "public_html", "ttbp", "index.html")
@@ -50,7 +60,37 @@ SETTINGS = {}
 HEADER = ""
 FOOTER = ""
 FILES = []
-NOPUBS = []
+MANIFEST = {}
+
+## nopub entries, in the order they're listed in the nopub file, and the
+## (mtime, size) of the nopub file they were read from
+NOPUBS = collections.OrderedDict()
+NOPUBS_STAMP = None
+
+## townie registry
+TOWNIES = set()
+TOWNIES_STAMP = None
+
+## other users' ttbprc files, by path: ((mtime, size), settings)
+RC_CACHE = {}
+
+## open publish transaction, if any
+TRANSACTION = None
+
+## held while rebuilding, since rebuilds may run on the background publisher,
+## and while changing anything a rebuild reads (see publish_update())
+PUBLISH_LOCK = threading.RLock()
+
+## full rebuilds this session, by kind
+REBUILDS = {"html": 0, "gopher": 0, "global feed": 0}
+
+## render counters
+RENDER_COUNT = 0
+CACHE_HITS = 0
+PASS_STATS = {}
+
+## what the last backup import did
+IMPORT_STATS = {}
 
 def load(ttbprc={}):
     '''
@@ -61,12 +101,14 @@ def load(ttbprc={}):
     global FOOTER
     global SETTINGS
 
-    HEADER = open(os.path.join(config.USER_CONFIG, "header.txt")).read()
-    FOOTER = open(os.path.join(config.USER_CONFIG, "footer.txt")).read()
-    SETTINGS = ttbprc
+    with publish_update():
+        HEADER = open(os.path.join(config.USER_CONFIG, "header.txt")).read()
+        FOOTER = open(os.path.join(config.USER_CONFIG, "footer.txt")).read()
+        SETTINGS = ttbprc
 
-    load_nopubs()
-    load_files()
+        load_nopubs()
+        load_manifest()
+        load_files()
 
 def reload_ttbprc(ttbprc={}):
     '''
@@ -75,22 +117,26 @@ def reload_ttbprc(ttbprc={}):
 
     global SETTINGS
 
-    SETTINGS = ttbprc
+    with publish_update():
+        SETTINGS = ttbprc
 
-def get_files(feelsdir=config.MAIN_FEELS):
+def get_files(feelsdir=config.MAIN_FEELS, entries=None):
     """Returns a list of user's feels in the given directory (defaults to main
-    feels dir)"""
+    feels dir)
+
+    takes an already-scanned list of entries from scanner.entries(), if the
+    caller has one"""
+
+    if entries is None:
+        entries = scanner.entries(feelsdir)
 
     files = []
-    for filename in os.listdir(feelsdir):
-        if nopub(filename):
-            unpublish_feel(filename)
+    for entry in entries:
+        if nopub(entry.name):
+            unpublish_feel(entry.name)
         else:
-            filename = os.path.join(feelsdir, filename)
-            if os.path.isfile(filename) and valid(filename):
-                files.append(filename)
+            files.append(entry.path)
 
-    files.sort()
     files.reverse()
 
     return files
@@ -100,104 +146,575 @@ def load_files(feelsdir=config.MAIN_FEELS):
     file loader
 
     * reads user's nopub file
-    * calls get_files() to load all files for given directory
-    * re-renders main html file and/or gopher if needed
+    * scans the given directory once, then calls get_files() to load all
+      files from it
+    * refreshes this user's rows in the town-wide feed index and their latest
+      entry summary
+    * requests a re-render of main html file and/or gopher; inside a publish
+      transaction, this waits until the transaction commits
     '''
 
     global FILES
 
-    load_nopubs()
-    FILES = get_files(feelsdir)
+    with publish_update():
+        load_nopubs()
+        entries = scanner.entries(feelsdir)
+        FILES = get_files(feelsdir, entries)
+        feed.update_index(entries, NOPUBS)
+        feed.update_latest(entries)
+
+        request_publish()
+
+## publish transactions
+
+def begin_publish():
+    '''
+    opens a publish transaction; publish requests made until the matching
+    commit_publish() are collected and flushed once. transactions nest, and
+    only the outermost commit flushes.
+    '''
+
+    global TRANSACTION
+
+    if TRANSACTION is None:
+        TRANSACTION = {"depth": 0, "html": False, "gophermap": False, "global feed": False}
+
+    TRANSACTION["depth"] += 1
+
+def request_publish(html=True, gophermap=True, global_feed=False):
+    '''
+    marks html, the gophermap, and/or the global feed as needing a rebuild
+
+    * outside of a transaction, the rebuild happens right away
+    '''
+
+    if TRANSACTION is None:
+        dispatch_publish(html, gophermap, global_feed)
+        return
+
+    TRANSACTION["html"] = TRANSACTION["html"] or html
+    TRANSACTION["gophermap"] = TRANSACTION["gophermap"] or gophermap
+    TRANSACTION["global feed"] = TRANSACTION["global feed"] or global_feed
+
+def commit_publish():
+    '''
+    closes a publish transaction, flushing everything it collected if this is
+    the outermost one
+    '''
+
+    global TRANSACTION
+
+    if TRANSACTION is None:
+        return
+
+    TRANSACTION["depth"] -= 1
+
+    if TRANSACTION["depth"] > 0:
+        return
+
+    dirty = TRANSACTION
+    TRANSACTION = None
+
+    if dirty["html"] or dirty["gophermap"] or dirty["global feed"]:
+        dispatch_publish(dirty["html"], dirty["gophermap"], dirty["global feed"])
+
+def discard_publish():
+    '''
+    drops whatever the open transaction has collected, for when there's
+    nothing left to publish to (like after an account wipe)
+    '''
+
+    if TRANSACTION is not None:
+        TRANSACTION.update({"html": False, "gophermap": False, "global feed": False})
+
+@contextlib.contextmanager
+def publish_transaction():
+    '''
+    wraps begin_publish() and commit_publish() around a block; the commit runs
+    even if the block is interrupted, since anything it changed on disk still
+    needs publishing
+    '''
+
+    begin_publish()
+    try:
+        yield
+    finally:
+        commit_publish()
+
+@contextlib.contextmanager
+def publish_update():
+    '''
+    wraps a change to the state that rebuilds read (FILES, NOPUBS, MANIFEST,
+    HEADER, FOOTER, SETTINGS, and the published files themselves)
+
+    * holds PUBLISH_LOCK, so a background rebuild never sees the change half
+      done, and never has it change underneath it
+    * runs inside a publish transaction, so any rebuild the change asks for
+      is only dispatched after the lock is let go
+    '''
+
+    with publish_transaction():
+        with PUBLISH_LOCK:
+            yield
+
+def dispatch_publish(html=True, gophermap=True, global_feed=False):
+    '''
+    hands rebuilds to the background publisher if the user has it turned on,
+    otherwise runs them right away
+    '''
+
+    if SETTINGS.get("background publishing"):
+        publisher.start(flush_publish)
+        publisher.submit(html, gophermap, global_feed)
+    else:
+        flush_publish(html, gophermap, global_feed)
+
+def flush_publish(html=True, gophermap=True, global_feed=False):
+    '''
+    does the actual rebuilds: html and gopher from the current FILES, and the
+    global feed page
+    '''
+
+    with PUBLISH_LOCK:
+        if publishing():
+            if html:
+                write_html("index.html")
+            if gophermap and SETTINGS.get('gopher'):
+                REBUILDS["gopher"] += 1
+                gopher.publish_gopher('feels', FILES, SETTINGS.get('gopher shards', False))
+
+        if global_feed:
+            www_neighbors()
+
+def wait_publish():
+    '''
+    blocks until the background publisher has caught up, if it's running
+    '''
+
+    publisher.wait()
+
+def publish_error():
+    '''
+    returns the exception from the last failed background rebuild, if there's
+    been one since the last call, otherwise None
+    '''
+
+    return publisher.take_error()
+
+def finish_publish():
+    '''
+    finishes any background rebuilds and shuts the background publisher down;
+    call this before exiting
+    '''
 
-    if publishing():
-        write_html("index.html")
-        if SETTINGS.get('gopher'):
-            gopher.publish_gopher('feels', FILES)
+    publisher.stop()
 
 def load_nopubs():
     """Load a list of the user's nopub entries.
+
+    the parsed file is cached by mtime and size, so it only gets read again
+    after it changes on disk.
     """
 
     global NOPUBS
+    global NOPUBS_STAMP
+
+    try:
+        stat = os.stat(config.NOPUB)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
 
-    NOPUBS = []
+    if stamp is not None and stamp == NOPUBS_STAMP:
+        return len(NOPUBS)
 
-    if os.path.isfile(config.NOPUB):
+    NOPUBS = collections.OrderedDict()
+
+    if stamp is not None:
         for line in open(config.NOPUB, "r"):
-            if not re.match("^# ", line):
-                NOPUBS.append(line.rstrip())
+            if not re.match("^# ", line) and line.strip():
+                NOPUBS[line.rstrip()] = True
+
+    NOPUBS_STAMP = stamp
 
     return len(NOPUBS)
 
+def save_nopubs():
+    """Writes the user's nopub entries back out to their nopub file, in the
+    order they were added.
+    """
+
+    global NOPUBS_STAMP
+
+    util.write_atomic(config.NOPUB, ["""\
+# files that don't get published html/gopher. this file is
+# generated by ttbp; editing it directly may result in unexpected
+# behavior. if you have problems, back up this file, delete it, and
+# rebuild it from ttbp.\n"""] + [entry+"\n" for entry in NOPUBS])
+
+    stat = os.stat(config.NOPUB)
+    NOPUBS_STAMP = (stat.st_mtime_ns, stat.st_size)
+
+def add_nopubs(filenames):
+    """Adds a batch of filenames to the end of the user's nopub entries, and
+    writes the nopub file once. Returns the ones that weren't nopub already.
+    """
+
+    added = []
+
+    for filename in filenames:
+        filename = os.path.basename(filename)
+        if filename not in NOPUBS:
+            NOPUBS[filename] = True
+            added.append(filename)
+
+    if added:
+        save_nopubs()
+
+    return added
+
+def remove_nopubs(filenames):
+    """Removes a batch of filenames from the user's nopub entries, and writes
+    the nopub file once. Returns the ones that were actually nopub.
+    """
+
+    removed = []
+
+    for filename in filenames:
+        filename = os.path.basename(filename)
+        if filename in NOPUBS:
+            del NOPUBS[filename]
+            removed.append(filename)
+
+    if removed:
+        save_nopubs()
+
+    return removed
+
+def load_manifest():
+    '''
+    render manifest loader
+
+    * the manifest records the size, mtime, and content hash of every entry the
+      last time it was rendered, along with the header/footer/nopub state it
+      was rendered with and the resulting entry html
+    * starts from an empty manifest if the file is missing or unreadable
+    '''
+
+    global MANIFEST
+
+    MANIFEST = {"entries": {}}
+
+    try:
+        with open(config.MANIFEST, "r") as manifest:
+            MANIFEST.update(json.load(manifest))
+    except (IOError, ValueError):
+        pass
+
+    return len(MANIFEST["entries"])
+
+def save_manifest():
+    '''
+    writes the current render manifest back to disk
+    '''
+
+    util.write_atomic(config.MANIFEST, [json.dumps(MANIFEST)])
+
+def render_state():
+    '''
+    returns a hash of the current header and footer, so that pages rendered
+    with an older header or footer get rewritten
+    '''
+
+    return hashlib.sha256((HEADER+FOOTER).encode("utf-8")).hexdigest()
+
+def entry_hash(filename):
+    '''
+    returns a hash of the contents of the given entry file
+    '''
+
+    with open(os.path.join(config.MAIN_FEELS, filename), "rb") as entry:
+        return hashlib.sha256(entry.read()).hexdigest()
+
+def check_manifest(filename, state):
+    '''
+    compares an entry against its manifest record
+
+    * returns the (possibly refreshed) record if the permalink page is still
+      current, or None if the entry needs to be rendered again
+    * size and mtime are checked first; the content hash is only computed if
+      those have moved
+    '''
+
+    record = MANIFEST.get("entries", {}).get(os.path.basename(filename))
+
+    if not record:
+        return None
+
+    if record.get("render") != state or record.get("nopub") != nopub(filename):
+        return None
+
+    if not os.path.exists(os.path.join(config.WWW, "".join(util.parse_date(filename))+".html")):
+        return None
+
+    stat = os.stat(os.path.join(config.MAIN_FEELS, filename))
+
+    if stat.st_size == record.get("size") and stat.st_mtime == record.get("mtime"):
+        return record
+
+    if entry_hash(filename) != record.get("hash"):
+        return None
+
+    # touched but not changed; remember the new size and mtime
+    record.update({"size": stat.st_size, "mtime": stat.st_mtime})
+
+    return record
+
 ## html outputting
 
+def render_pass():
+    '''
+    entry renderer for a single publish pass
+
+    * walks FILES once, rendering each entry that changed since the last pass
+      exactly once and writing its permalink page from that same render
+    * unchanged entries are pulled from the render manifest
+    * returns a dict of entry filename to manifest record, and leaves a count
+      of what happened in PASS_STATS
+    * the manifest is only updated in memory; write_html() saves it once the
+      index pages are done too
+    '''
+
+    global PASS_STATS
+
+    state = render_state()
+    records = {}
+    renders = RENDER_COUNT
+    changed = 0
+
+    for filename in FILES:
+        record = check_manifest(filename, state)
+
+        if record is None:
+            changed += 1
+            path = os.path.join(config.MAIN_FEELS, filename)
+            stat = os.stat(path)
+            with open(path, "rb") as rawfile:
+                raw = rawfile.read()
+            entry = write_entry(filename, raw.decode("utf-8", "replace"))
+            write_page(filename, entry)
+            record = {
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "hash": hashlib.sha256(raw).hexdigest(),
+                    "render": state,
+                    "nopub": nopub(filename),
+                    "fragment": "".join(entry)
+                    }
+
+        records[os.path.basename(filename)] = record
+
+    # anything no longer in FILES drops out of the manifest, and its permalink
+    # page goes too, in case it was rewritten after being unpublished
+    for name in MANIFEST.get("entries", {}):
+        if name not in records:
+            stale = os.path.join(config.WWW, os.path.splitext(name)[0]+".html")
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    MANIFEST["entries"] = records
+
+    PASS_STATS = {
+            "entries": len(FILES),
+            "changed": changed,
+            "renders": RENDER_COUNT - renders
+            }
+
+    return records
+
 def write_html(outurl="default.html"):
     '''
     main page renderer
 
-    * takes everything currently in FILES and writes a single non-paginated html
-    file
-    * calls write_page() on each file to make permalinks
+    * takes everything currently in FILES and writes the index; with a "page
+      size" set, the index is split across several pages and every month gets
+      an archive page, otherwise it's a single non-paginated html file
+    * calls render_pass() to make permalinks for changed entries, then builds
+      the index from the entry html it hands back
+    * each index and archive page's fingerprint is kept in the render
+      manifest along with the size and mtime of the file that was written, and
+      a page is only rewritten if its fingerprint moved or the file on disk
+      isn't the one that was written (say, www was recreated with a
+      placeholder index)
     '''
 
-    outfile = open(os.path.join(config.WWW, outurl), "w")
+    REBUILDS["html"] += 1
 
-    outfile.write("<!--generated by the tilde.town blogging platform on "+time.strftime("%d %B %y")+"\nhttp://tilde.town/~endorphant/ttbp/-->\n\n")
+    records = render_pass()
+    state = render_state()
+    size = SETTINGS.get("page size", 0)
 
-    for line in HEADER:
-        outfile.write(line)
+    pages = index_pages(outurl, size)
+    if size:
+        pages += archive_pages(outurl)
 
-    outfile.write("\n")
+    old = MANIFEST.get("pages", {})
+    fingerprints = {}
+    written = 0
 
-    for filename in FILES:
-        write_page(filename)
-        for line in write_entry(filename):
-            outfile.write(line)
+    for name, filenames, nav, listing in pages:
+        fingerprint = hashlib.sha256()
+        fingerprint.update((state+nav+listing).encode("utf-8"))
+        for filename in filenames:
+            fingerprint.update((os.path.basename(filename)+records[os.path.basename(filename)]["hash"]).encode("utf-8"))
+        fingerprint = fingerprint.hexdigest()
+
+        path = os.path.join(config.WWW, name)
+        try:
+            stat = os.stat(path)
+            if old.get(name) == [fingerprint, stat.st_size, stat.st_mtime]:
+                fingerprints[name] = old[name]
+                continue
+        except OSError:
+            pass
+
+        page = [generated_stamp(), HEADER, "\n", nav, listing]
+
+        for filename in filenames:
+            page.append(records[os.path.basename(filename)]["fragment"])
+            page.append("\n")
+
+        page.append(nav)
+        page.append(FOOTER)
+
+        util.write_atomic(path, page)
+        stat = os.stat(path)
+        fingerprints[name] = [fingerprint, stat.st_size, stat.st_mtime]
+        written += 1
 
-        outfile.write("\n")
+    # pages that aren't part of the index anymore (the page size changed, or
+    # a month emptied out) get cleaned up
+    for name in old:
+        if name not in fingerprints:
+            stale = os.path.join(config.WWW, name)
+            if os.path.exists(stale):
+                os.remove(stale)
 
-    for line in FOOTER:
-        outfile.write(line)
+    MANIFEST["pages"] = fingerprints
+    save_manifest()
 
-    outfile.close()
+    PASS_STATS["pages"] = written
 
     return os.path.join(config.LIVE+config.USER,os.path.basename(os.path.realpath(config.WWW)),outurl)
 
-def write_page(filename):
+def index_pages(outurl, size):
+    '''
+    splits FILES into index pages of the given size
+
+    * returns a list of (page filename, entry filenames, nav html, extra
+      html), newest page first; the newest page is always outurl
+    * pages are counted from the oldest entry forward, so page1.html holds the
+      first entries ever written and a full page never changes when new
+      entries come in; outurl holds the newest full page plus anything newer
+      than it
     '''
-    permalink generator
 
-    * makes a page out of a single entry for permalinking, using filename/date as
-    url
+    full = 0
+    if size:
+        full = len(FILES) // size
+
+    if full <= 1:
+        if size:
+            return [(outurl, FILES, page_nav(["<a href=\"archive.html\">archive</a>"]), "")]
+        return [(outurl, FILES, "", "")]
+
+    oldest = FILES[::-1]
+    names = [outurl] + ["page"+str(number)+".html" for number in range(full-1, 0, -1)]
+    chunks = [oldest[(full-1)*size:][::-1]]
+    for number in range(full-1, 0, -1):
+        chunks.append(oldest[(number-1)*size:number*size][::-1])
+
+    pages = []
+    for place, name in enumerate(names):
+        links = []
+        if place > 0:
+            links.append("<a href=\""+names[place-1]+"\">newer</a>")
+        if place < len(names) - 1:
+            links.append("<a href=\""+names[place+1]+"\">older</a>")
+        links.append("<a href=\"archive.html\">archive</a>")
+        pages.append((name, chunks[place], page_nav(links), ""))
+
+    return pages
+
+def archive_pages(outurl):
     '''
+    groups FILES by month
 
-    outurl = os.path.join(config.WWW, "".join(util.parse_date(filename))+".html")
-    outfile = open(outurl, "w")
+    * returns a list of (page filename, entry filenames, nav html, extra
+      html) with one archive-YYYYMM.html per month, followed by archive.html,
+      which links to each of them
+    * the archive list only changes when a month is added or removed
+    '''
+
+    months = collections.OrderedDict()
+    for filename in FILES:
+        year, month, day = util.parse_date(filename)
+        months.setdefault(year+month, []).append(filename)
 
-    outfile.write("<!--generated by the tilde.town blogging platform on "+time.strftime("%d %B %y")+"\nhttp://tilde.town/~endorphant/ttbp/-->\n\n")
+    nav = page_nav(["<a href=\""+outurl+"\">latest</a>",
+        "<a href=\"archive.html\">archive</a>"])
 
-    for line in HEADER:
-        outfile.write(line)
+    pages = []
+    listing = ["\t\t<div class=\"archive\">\n"]
+    for month, filenames in months.items():
+        name = "archive-"+month+".html"
+        pages.append((name, filenames, nav, ""))
+        listing.append("\t\t\t<p><a href=\""+name+"\">"+chatter.month(month[4:])+" "+month[:4]+"</a></p>\n")
+    listing.append("\t\t</div>\n")
 
-    outfile.write("\n")
+    pages.append(("archive.html", [], page_nav(["<a href=\""+outurl+"\">latest</a>"]), "".join(listing)))
 
-    for line in write_entry(filename):
-        outfile.write(line)
+    return pages
 
-    outfile.write("\n")
+def page_nav(links):
+    '''
+    returns the navigation block for an index or archive page
+    '''
 
-    for line in FOOTER:
-        outfile.write(line)
+    return "\t\t<p class=\"pages\">"+" | ".join(links)+"</p>\n"
+
+def write_page(filename, entry=None):
+    '''
+    permalink generator
 
-    outfile.close()
+    * makes a page out of a single entry for permalinking, using filename/date as
+    url
+    * takes an already-rendered entry from write_entry(), if there is one
+    '''
+
+    if entry is None:
+        entry = write_entry(filename)
+
+    outurl = os.path.join(config.WWW, "".join(util.parse_date(filename))+".html")
+
+    util.write_atomic(outurl, [generated_stamp(), HEADER, "\n"] + entry + ["\n", FOOTER])
 
     return outurl
 
-def write_entry(filename):
+def generated_stamp():
+    '''
+    returns the comment that goes at the top of every generated page
+    '''
+
+    return "<!--generated by the tilde.town blogging platform on "+time.strftime("%d %B %y")+"\nhttp://tilde.town/~endorphant/ttbp/-->\n\n"
+
+def write_entry(filename, raw=None):
     '''
     entry text generator
 
     * dump given file into entry format by parsing file as markdown
+    * takes the entry text if the caller already read it, otherwise reads it
+      from the file
     * return as list of strings
     '''
 
@@ -210,14 +727,12 @@ def write_entry(filename):
         #"\t\t\t<P>"
     ]
 
-    raw = []
-    rawfile = open(os.path.join(config.MAIN_FEELS, filename), "r")
+    if raw is None:
+        rawfile = open(os.path.join(config.MAIN_FEELS, filename), "r")
+        raw = rawfile.read()
+        rawfile.close()
 
-    for line in rawfile:
-        raw.append(line)
-    rawfile.close()
-
-    entry.append("\t\t\t"+mistune.markdown("".join(raw), escape=False, hard_wrap=False))
+    entry.append("\t\t\t"+render_markdown(raw))
 
     #for line in raw:
         #entry.append(line+"\t\t\t")
@@ -230,6 +745,32 @@ def write_entry(filename):
 
     return entry
 
+def render_markdown(text):
+    '''
+    markdown engine wrapper
+
+    * every entry render goes through here, so RENDER_COUNT tracks how many
+      times mistune actually ran this session
+    * checks the on-disk render cache first; CACHE_HITS counts the renders it
+      saved
+    '''
+
+    global RENDER_COUNT
+    global CACHE_HITS
+
+    html = cache.get(text)
+
+    if html is not None:
+        CACHE_HITS += 1
+        return html
+
+    RENDER_COUNT += 1
+
+    html = mistune.markdown(text, **cache.MARKDOWN_OPTIONS)
+    cache.put(text, html)
+
+    return html
+
 def write_global_feed(blogList):
     '''
     main ttbp index printer
@@ -314,53 +855,98 @@ def meta(entries = FILES):
     meta = []
 
     for filename in entries:
-      mtime = os.path.getmtime(filename)
-      try:
-        wc = int(subprocess.check_output(["wc","-w",filename], stderr=subprocess.STDOUT).split()[0])
-      except subprocess.CalledProcessError:
-        wc = "???"
-      timestamp = time.strftime("%Y-%m-%d at %H:%M", time.localtime(mtime))
-      date = "-".join(util.parse_date(filename))
-      author = os.path.split(os.path.split(os.path.split(os.path.split(filename)[0])[0])[0])[1]
-
-      meta.append([filename, mtime, wc, timestamp, date, author])
+        meta.append(entry_meta(filename))
 
     #meta.sort(key = lambda filename:filename[4])
     #meta.reverse()
 
     return meta
 
-def valid(filename):
+def entry_meta(filename):
     '''
-    filename validator
+    single-entry metadata reader
 
-    * check if the filename is YYYYMMDD.txt
+    * reads the file once, taking the mtime from the open file and counting
+      words in-process, and returns one row in the format meta() uses
+    * word count is "???" if the file can't be read
     '''
 
-    filesplit = os.path.splitext(os.path.basename(filename))
+    try:
+        with open(filename, "rb") as entry:
+            mtime = os.fstat(entry.fileno()).st_mtime
+            wc = util.word_count(entry.read())
+    except (IOError, OSError):
+        mtime = os.path.getmtime(filename)
+        wc = "???"
 
-    if filesplit[1] != ".txt":
-        return False
+    timestamp = time.strftime("%Y-%m-%d at %H:%M", time.localtime(mtime))
+    date = "-".join(util.parse_date(filename))
+    author = os.path.split(os.path.split(os.path.split(os.path.split(filename)[0])[0])[0])[1]
 
-    pattern = '^((19|20)\d{2})(0[1-9]|1[0-2])(0[1-9]|1\d|2\d|3[01])$'
+    return [filename, mtime, wc, timestamp, date, author]
 
-    if not re.match(pattern, filesplit[0]):
-        return False
+def valid(filename):
+    '''
+    filename validator
+
+    * check if the filename is YYYYMMDD.txt
+    '''
 
-    return True
+    return scanner.valid(filename)
 
 def find_ttbps():
     '''
     returns a list of users with a ttbp by checking for a valid ttbprc
     '''
 
-    users = []
+    return sorted(ttbp_users())
 
-    for townie in os.listdir("/home"):
-        if os.path.exists(os.path.join("/home", townie, ".ttbp", "config", "ttbprc")):
-            users.append(townie)
+def ttbp_users():
+    '''
+    townie registry
+
+    * returns the set of users with a ttbp, cached for the session
+    * the cache is rebuilt from a full /home scan the first time and whenever
+      /home changes
+    * if only users.txt has changed, just the names in it are checked, along
+      with everyone already known
+    '''
+
+    global TOWNIES
+    global TOWNIES_STAMP
+
+    try:
+        home = os.stat("/home").st_mtime
+    except OSError:
+        home = None
+
+    try:
+        userfile = os.stat(config.USERFILE).st_mtime
+    except OSError:
+        userfile = None
+
+    if TOWNIES_STAMP is None or TOWNIES_STAMP[0] != home:
+        candidates = os.listdir("/home")
+    elif TOWNIES_STAMP[1] != userfile:
+        candidates = set(TOWNIES)
+        try:
+            for line in open(config.USERFILE, "r"):
+                candidates.add(line.strip())
+        except IOError:
+            pass
+    else:
+        return TOWNIES
+
+    users = set()
+
+    for townie in candidates:
+        if townie and os.path.exists(os.path.join("/home", townie, ".ttbp", "config", "ttbprc")):
+            users.add(townie)
+
+    TOWNIES = users
+    TOWNIES_STAMP = (home, userfile)
 
-    return users
+    return TOWNIES
 
 def publishing(username=config.USER):
     '''
@@ -373,39 +959,66 @@ def publishing(username=config.USER):
         ttbprc = SETTINGS
 
     else:
-        ttbprc = json.load(open(os.path.join("/home", username, ".ttbp", "config", "ttbprc")))
+        ttbprc = user_settings(username)
 
     return ttbprc.get("publishing")
 
+def user_settings(username):
+    '''
+    returns the given user's parsed ttbprc, or an empty dict if it's missing or
+    unreadable
+
+    * parsed settings are cached by path, and only re-read when the file's
+      mtime or size changes
+    '''
+
+    ttbprc = os.path.join("/home", username, ".ttbp", "config", "ttbprc")
+
+    try:
+        stat = os.stat(ttbprc)
+    except OSError:
+        RC_CACHE.pop(ttbprc, None)
+        return {}
+
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = RC_CACHE.get(ttbprc)
+
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    try:
+        with open(ttbprc, "r") as rcfile:
+            settings = json.load(rcfile)
+    except (IOError, ValueError):
+        settings = {}
+
+    RC_CACHE[ttbprc] = (stamp, settings)
+
+    return settings
+
 def www_neighbors():
     '''
     takes a list of users with publiishing turned on and prepares it for www output
     '''
 
+    REBUILDS["global feed"] += 1
+
     userList = []
 
     for user in find_ttbps():
         if not publishing(user):
             continue
 
-        userRC = json.load(open(os.path.join("/home", user, ".ttbp", "config", "ttbprc")))
+        userRC = user_settings(user)
 
         url = ""
-        if userRC["publish dir"]:
+        if userRC.get("publish dir"):
             url = config.LIVE+user+"/"+userRC["publish dir"]
 
-        lastfile = ""
-        try:
-            files = os.listdir(os.path.join("/home", user, ".ttbp", "entries"))
-        except OSError:
-            files = []
-        files.sort()
-        for filename in files:
-            if valid(filename):
-                lastfile = os.path.join("/home", user, ".ttbp", "entries", filename)
+        lastfile = feed.last_entry(user)
 
         if lastfile:
-            last = os.path.getctime(lastfile)
+            last = lastfile[1]
             timestamp = time.strftime("%Y-%m-%d at %H:%M", time.localtime(last)) + " (utc"+time.strftime("%z")[0]+time.strftime("%z")[2]+")"
         else:
             timestamp = ""
@@ -435,31 +1048,43 @@ def toggle_nopub(filename):
     if the file is to be unpublished, delete it from published locations
     """
 
-    global NOPUBS
-
     action = "unpublishing"
 
     if nopub(filename):
         action = "publishing"
-        NOPUBS.remove(filename)
-    else:
-        NOPUBS.append(filename)
-        unpublish_feel(filename)
 
-    nopub_file = open(config.NOPUB, 'w')
-    nopub_file.write("""\
-# files that don't get published html/gopher. this file is
-# generated by ttbp; editing it directly may result in unexpected
-# behavior. if you have problems, back up this file, delete it, and
-# rebuild it from ttbp.\n""")
-    for entry in NOPUBS:
-        nopub_file.write(entry+"\n")
-    nopub_file.close()
-
-    load_files()
+    set_nopub([filename], action == "unpublishing")
 
     return action
 
+def set_nopub(filenames, hidden=True):
+    """sets pub/nopub status for a batch of filenames at once
+
+    entries being hidden get deleted from published locations. the nopub file
+    is written once and everything is republished once, no matter how many
+    entries changed; returns the list of filenames that actually changed.
+    """
+
+    with publish_update():
+        if hidden:
+            changed = add_nopubs(filenames)
+            for filename in changed:
+                unpublish_feel(filename)
+        else:
+            changed = remove_nopubs(filenames)
+
+        if changed:
+            load_files()
+
+    return changed
+
+def match_entries(spec):
+    """returns a sorted list of the user's entry filenames matching the given
+    date selection (see util.select_dates()), or None if it doesn't parse
+    """
+
+    return util.select_dates(spec, [entry.name for entry in scanner.scan(config.MAIN_FEELS)])
+
 def bury_feel(filename):
     """buries given filename; this removes the feel from any publicly-readable
     location, and moves the textfile to user's private feels directory.
@@ -471,31 +1096,70 @@ def bury_feel(filename):
     
     regenerates feels list and republishes."""
 
+    buried = bury_feels([filename])
+
+    if buried:
+        return buried[0]
+
+def bury_feels(filenames):
+    """buries a batch of feels at once; each one is removed from any
+    publicly-readable location and moved to user's private feels directory,
+    same as bury_feel().
+
+    regenerates feels list and republishes once, after everything's moved.
+    returns a list of the buried files' new paths."""
+
     if not os.path.exists(config.BURIED_FEELS):
-        os.mkdir(config.BURIED_FEELS)
-        subprocess.call(["chmod", "700", config.BURIED_FEELS])
+        fsops.make_dir(config.BURIED_FEELS, 0o700)
 
-    buryname = os.path.splitext(os.path.basename(filename))[0]+"-"+str(int(time.time()))+".txt"
+    stamp = str(int(time.time()))
+    buried = []
 
-    subprocess.call(["mv", os.path.join(config.MAIN_FEELS, filename), os.path.join(config.BURIED_FEELS, buryname)])
-    subprocess.call(["chmod", "600", os.path.join(config.BURIED_FEELS, buryname)])
+    with publish_update():
+        for filename in filenames:
+            filename = os.path.basename(filename)
+            buryname = os.path.join(config.BURIED_FEELS, os.path.splitext(filename)[0]+"-"+stamp+".txt")
 
-    if publishing():
-        unpublish_feel(filename)
+            if not fsops.move(os.path.join(config.MAIN_FEELS, filename), buryname):
+                continue
 
-    load_files()
+            fsops.chmod(buryname, 0o600)
+            unpublish_feel(filename)
+            buried.append(buryname)
 
-    return os.path.join(config.BURIED_FEELS, buryname)
+        if buried:
+            load_files()
+
+    return buried
 
 def delete_feel(filename):
     """deletes given filename; removes the feel from publicly-readable
     locations, then deletes the original file."""
 
-    feel = os.path.join(config.MAIN_FEELS, filename)
-    if os.path.exists(feel):
-        subprocess.call(["rm", feel])
-        unpublish_feel(filename)
-        load_files(config.MAIN_FEELS)
+    delete_feels([filename])
+
+def delete_feels(filenames):
+    """deletes a batch of feels at once, removing each from publicly-readable
+    locations, same as delete_feel().
+
+    regenerates feels list and republishes once, after everything's gone.
+    returns a list of the deleted filenames."""
+
+    deleted = []
+
+    with publish_update():
+        for filename in filenames:
+            filename = os.path.basename(filename)
+            feel = os.path.join(config.MAIN_FEELS, filename)
+
+            if os.path.exists(feel) and fsops.remove(feel):
+                unpublish_feel(filename)
+                deleted.append(filename)
+
+        if deleted:
+            load_files(config.MAIN_FEELS)
+
+    return deleted
 
 def unpublish_feel(filename):
     """takes given filename and removes it from public_html and gopher_html, if
@@ -504,49 +1168,103 @@ def unpublish_feel(filename):
     live_html = os.path.join(config.WWW,
             os.path.splitext(os.path.basename(filename))[0]+".html")
     if os.path.exists(live_html):
-        subprocess.call(["rm", live_html])
+        fsops.remove(live_html)
     live_gopher = os.path.join(config.GOPHER_PATH, filename)
     if os.path.exists(live_gopher):
-        subprocess.call(["rm", live_gopher])
+        fsops.remove(live_gopher)
 
 def process_backup(filename):
-    """takes given filename and unpacks it into a temp directory, then returns a
-    list of filenames with collisions filtered out.
+    """takes given filename and streams the entries out of it one at a time,
+    yielding (filename, contents, mtime) for each one that can be imported,
+    where mtime is the entry's modification time in the archive.
 
-    ignores any invalidly named files or files that already exist, to avoid
-    clobbering current feels. ignored files are left in the archive directory
-    for the user to manually sort out."""
+    nothing is unpacked to disk except for collisions: entries that already
+    exist with the same contents are skipped, and entries that exist with
+    different contents are left in a directory under backups for the user to
+    manually sort out, so current feels never get clobbered. invalidly named
+    files are ignored.
 
-    backup_dir = os.path.splitext(os.path.splitext(os.path.basename(filename))[0])[0]
-    backup_path = os.path.join(config.BACKUPS, backup_dir)
-
-    if not os.path.exists(backup_path):
-        subprocess.call(["mkdir", backup_path])
-
-    subprocess.call(["chmod", "700", backup_path])
-    subprocess.call(["tar", "-C", backup_path, "-xf", filename])
-    backup_entries = os.path.join(backup_path, "entries")
-
-    backups = os.listdir(backup_entries)
-    current = os.listdir(config.MAIN_FEELS)
+    a count of what happened is left in IMPORT_STATS. if the archive can't be
+    opened or turns out to be truncated or corrupt, the error is reported, the
+    entries read before it are still yielded, and IMPORT_STATS["failed"] is
+    set."""
 
-    imported = []
+    global IMPORT_STATS
 
-    for feel in backups:
-        if os.path.basename(feel) not in current:
-            imported.append(os.path.join(backup_entries, feel))
-
-    imported.sort()
-    return imported
+    backup_dir = os.path.splitext(os.path.splitext(os.path.basename(filename))[0])[0]
+    leftover_dir = os.path.join(config.BACKUPS, backup_dir, "entries")
+
+    IMPORT_STATS = {
+            "imported": 0,
+            "duplicates": 0,
+            "leftovers": 0,
+            "leftover dir": leftover_dir,
+            "failed": False
+            }
+
+    current = set(os.listdir(config.MAIN_FEELS))
+    hashes = {}
+
+    try:
+        archive = tarfile.open(filename, "r:*")
+    except (tarfile.TarError, EOFError, zlib.error, OSError) as error:
+        fsops.report("open", filename, error)
+        IMPORT_STATS["failed"] = True
+        return
+
+    try:
+        with archive:
+            for member in archive:
+                (folder, name) = os.path.split(os.path.normpath(member.name))
+                if folder != "entries" or not member.isfile() or not scanner.valid(name):
+                    continue
+
+                contents = archive.extractfile(member).read()
+
+                if name not in current:
+                    current.add(name)
+                    hashes[name] = hashlib.sha256(contents).hexdigest()
+                    yield (name, contents, member.mtime)
+                    continue
+
+                if name not in hashes:
+                    hashes[name] = entry_hash(name)
+
+                if hashlib.sha256(contents).hexdigest() == hashes[name]:
+                    IMPORT_STATS["duplicates"] += 1
+                    continue
+
+                if fsops.ensure_dir(os.path.dirname(leftover_dir), 0o700) and \
+                        fsops.ensure_dir(leftover_dir):
+                    leftover = os.path.join(leftover_dir, name)
+                    util.write_atomic(leftover, [contents], binary=True)
+                    os.utime(leftover, (member.mtime, member.mtime))
+                    IMPORT_STATS["leftovers"] += 1
+    except (tarfile.TarError, EOFError, zlib.error, OSError) as error:
+        # a truncated gzip stream ends in EOFError, which would otherwise look
+        # like ctrl-d to the menus
+        fsops.report("read", filename, error)
+        IMPORT_STATS["failed"] = True
 
 def import_feels(backups):
-    """takes a list of filepaths and copies those to current main feels.
+    """takes an iterable of (filename, contents, mtime) and writes each one to
+    current main feels, then reloads and republishes once at the end.
 
-    this does not check for collisions.
+    each entry is written atomically, then given back the mtime it had when it
+    was backed up, so restored feels don't show up as new. this does not check
+    for collisions; see process_backup() for that.
     """
 
-    pass
+    with publish_transaction():
+        for filename, contents, mtime in backups:
+            path = os.path.join(config.MAIN_FEELS, filename)
+            util.write_atomic(path, [contents], binary=True)
+            os.utime(path, (mtime, mtime))
+            IMPORT_STATS["imported"] = IMPORT_STATS.get("imported", 0) + 1
+
+        load_files()
 
+    return IMPORT_STATS.get("imported", 0)
 
 #############
 #############
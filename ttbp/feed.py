@@ -0,0 +1,405 @@
+"""
+This module contains the town-wide entry index used by the global feed.
+
+Every ttbp session keeps a small index file for its own user in
+~/.ttbp/config/feed-index, with one row per entry:
+
+    [author, date YYYYMMDD, mtime, word count, nopub]
+
+The index also records the mtime of the user's entries directory when it was
+written. Readers compare that against the directory as it is now; if they
+match, the rows can be used without listing or reading any entries, and if
+they don't, the caller falls back to scanning that user's directory.
+
+Each session also keeps a tiny summary of its user's most recent entry in
+~/.ttbp/config/latest, validated the same way, so the neighbors views can find
+everyone's last post without walking their entries directories. The summary
+also has the newest mtime of any of their entries, which the progressive
+global feed (FeedStream) uses to decide whose entries to read first, and when
+the top of the feed can't change any more.
+"""
+import heapq
+import json
+import os
+import threading
+import time
+from concurrent import futures
+
+from . import config
+from . import scanner
+from . import util
+
+# number of entries shown in a feed
+FEED_SIZE = 50
+
+# number of townies scanned at once by a progressive feed
+SCAN_WORKERS = 8
+
+def index_path(townie):
+    '''
+    returns the path to the given townie's index file
+    '''
+
+    return os.path.join("/home", townie, ".ttbp", "config", "feed-index")
+
+def entry_dir(townie):
+    '''
+    returns the path to the given townie's entries directory
+    '''
+
+    return os.path.join("/home", townie, ".ttbp", "entries")
+
+def read_index(path):
+    '''
+    returns the index at the given path as a dict, or None if it doesn't
+    exist or can't be read
+    '''
+
+    try:
+        with open(path, "r") as index:
+            index = json.load(index)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if not isinstance(index, dict):
+        return None
+
+    return index
+
+def load_rows(townie):
+    '''
+    returns the given townie's index rows if the index is current, otherwise
+    None
+
+    * the index is current if their entries directory hasn't changed since the
+      index was written
+    * an index file only counts if it's owned by the same user as the
+      entries directory, and only well-formed rows that name the townie as
+      author are used
+    '''
+
+    index = read_index(index_path(townie))
+
+    if not index or not isinstance(index.get("entries", []), list):
+        return None
+
+    try:
+        entries = os.stat(entry_dir(townie))
+        owner = os.stat(index_path(townie)).st_uid
+    except OSError:
+        return None
+
+    if owner != entries.st_uid or index.get("dir mtime") != entries.st_mtime:
+        return None
+
+    rows = []
+    for row in index.get("entries", []):
+        try:
+            if (len(row) == 5 and row[0] == townie and isinstance(row[2], (int, float))
+                    and scanner.ENTRY_NAME.match(row[1]+".txt")):
+                rows.append(row)
+        except TypeError:
+            continue
+
+    return rows
+
+def update_index(entries, nopubs):
+    '''
+    rewrites the current user's index from the given list of scanner.Entry
+    records
+
+    * rows for entries whose mtime hasn't moved are carried over from the old
+      index, so only new or edited entries are read and word-counted
+    * failing to write the index isn't fatal; the global feed will just scan
+      this user's entries directly
+    '''
+
+    try:
+        dir_mtime = os.stat(config.MAIN_FEELS).st_mtime
+    except OSError:
+        return
+
+    old = {}
+    for row in (read_index(config.FEED_INDEX) or {}).get("entries", []):
+        old[row[1]] = row
+
+    rows = []
+    for entry in entries:
+        nopub = entry.name in nopubs
+        mtime = entry.stat.st_mtime
+
+        row = old.get(entry.date)
+        if row and row[2] == mtime:
+            row[4] = nopub
+        else:
+            try:
+                with open(entry.path, "rb") as rawfile:
+                    wc = util.word_count(rawfile.read())
+            except (IOError, OSError):
+                wc = "???"
+            row = [config.USER, entry.date, mtime, wc, nopub]
+
+        rows.append(row)
+
+    try:
+        util.write_atomic(config.FEED_INDEX,
+                [json.dumps({"dir mtime": dir_mtime, "entries": rows})])
+    except (IOError, OSError):
+        pass
+
+def row_meta(row):
+    '''
+    turns an index row into the metadata format used by core.meta()
+    '''
+
+    author, date, mtime, wc, nopub = row
+
+    return [os.path.join(entry_dir(author), date+".txt"),
+            mtime,
+            wc,
+            time.strftime("%Y-%m-%d at %H:%M", time.localtime(mtime)),
+            "-".join(util.parse_date(date)),
+            author]
+
+def newest(candidates, count=FEED_SIZE):
+    '''
+    takes an iterable of (mtime, entry) and returns the given number of most
+    recent ones, newest first
+
+    * keeps a heap of at most count entries, so memory stays flat no matter
+      how many candidates go through
+    '''
+
+    heap = []
+
+    for order, (mtime, entry) in enumerate(candidates):
+        if len(heap) < count:
+            heapq.heappush(heap, (mtime, order, entry))
+        elif mtime > heap[0][0]:
+            heapq.heapreplace(heap, (mtime, order, entry))
+
+    heap.sort(reverse=True)
+
+    return [(mtime, entry) for (mtime, order, entry) in heap]
+
+def update_latest(entries):
+    '''
+    rewrites the current user's latest entry summary from the given list of
+    scanner.Entry records, sorted by date
+    '''
+
+    try:
+        dir_mtime = os.stat(config.MAIN_FEELS).st_mtime
+    except OSError:
+        return
+
+    summary = {"dir mtime": dir_mtime, "count": len(entries)}
+
+    if entries:
+        summary.update({"filename": entries[-1].name, "ctime": entries[-1].stat.st_ctime,
+            "newest": max(entry.stat.st_mtime for entry in entries)})
+
+    try:
+        util.write_atomic(config.LATEST, [json.dumps(summary)])
+    except (IOError, OSError):
+        pass
+
+def read_latest(townie):
+    '''
+    returns the given townie's latest entry summary as a dict if it's current,
+    otherwise None
+    '''
+
+    try:
+        dir_mtime = os.stat(entry_dir(townie)).st_mtime
+        with open(os.path.join("/home", townie, ".ttbp", "config", "latest"), "r") as summary:
+            latest = json.load(summary)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if latest.get("dir mtime") != dir_mtime:
+        return None
+
+    return latest
+
+def newest_mtime(townie):
+    '''
+    returns the newest mtime of any of the given townie's entries, going by
+    their latest entry summary, or None if that isn't known
+
+    * a townie with no entries gets 0
+    '''
+
+    latest = read_latest(townie)
+
+    if latest is None:
+        return None
+
+    if not latest.get("filename"):
+        return 0
+
+    return latest.get("newest")
+
+def last_entry(townie):
+    '''
+    returns a tuple of (filename, ctime) for the given townie's most recent
+    entry, or None if they don't have any
+
+    * reads their latest entry summary if it's current, otherwise falls back
+      to scanning their entries directory
+    '''
+
+    entries = entry_dir(townie)
+    latest = read_latest(townie)
+
+    if latest is not None:
+        if not latest.get("filename"):
+            return None
+        return (os.path.join(entries, latest["filename"]), latest["ctime"])
+
+    found = scanner.latest(entries)
+    if found is None:
+        return None
+
+    return (found.path, found.stat.st_ctime)
+
+class FeedStream(object):
+    '''
+    a read-only list of the most recent entries by the given townies, newest
+    first, filled in by a pool of scanner threads while it's being looked at
+
+    * candidates(townie) yields (mtime, entry) for one townie's entries, like
+      newest() takes; the list holds the entries
+    * townies are scanned most recent poster first, going by newest_mtime();
+      townies without a current summary go before everyone else
+    * an entry only joins the list once no townie still waiting to be scanned
+      could have anything newer, so the list only grows at the end and
+      positions already on screen never change
+    '''
+
+    def __init__(self, townies, candidates, count=FEED_SIZE, workers=SCAN_WORKERS):
+        self.candidates = candidates
+        self.count = count
+        self.heap = []
+        self.found = []
+        self.finished = False
+        self.stopped = False
+        self.lock = threading.Condition()
+
+        worker = threading.Thread(target=self.run, args=(list(townies), workers), name="ttbp feed")
+        worker.daemon = True
+        worker.start()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.found)
+
+    def __getitem__(self, index):
+        with self.lock:
+            return self.found[index]
+
+    def wait(self, count):
+        '''
+        blocks until the list has at least count entries or the scan is
+        finished; returns True if more entries may still be coming
+        '''
+
+        with self.lock:
+            while len(self.found) < count and not self.finished and not self.stopped:
+                self.lock.wait()
+
+            return not self.finished and not self.stopped
+
+    def stop(self):
+        '''
+        stops the scan once nobody's looking at the feed anymore; scans that
+        are already running finish, and anything still queued is dropped
+        '''
+
+        with self.lock:
+            self.stopped = True
+            self.lock.notify_all()
+
+    def scan(self, townie):
+        '''
+        returns every candidate for one townie; a townie that can't be read
+        just has none
+        '''
+
+        try:
+            return list(self.candidates(townie))
+        except (IOError, OSError):
+            return []
+
+    def run(self, townies, workers):
+        '''
+        feed worker: ranks the townies, hands them to the scanner pool, and
+        settles the top of the feed as their candidates come back
+        '''
+
+        try:
+            with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                lookups = [pool.submit(newest_mtime, townie) for townie in townies]
+                bounds = []
+                for lookup in lookups:
+                    if self.stopped:
+                        cancel(lookups)
+                        return
+                    bounds.append(lookup.result())
+
+                ranked = sorted(zip(townies, bounds), key=lambda pair: (pair[1] is not None, -(pair[1] or 0)))
+                limits = [float("inf") if bound is None else bound for (townie, bound) in ranked]
+                pending = dict((pool.submit(self.scan, townie), position)
+                        for (position, (townie, bound)) in enumerate(ranked))
+
+                done = [False] * len(ranked)
+                first = 0
+                order = 0
+
+                for future in futures.as_completed(pending):
+                    if self.stopped:
+                        cancel(pending)
+                        return
+
+                    done[pending[future]] = True
+                    while first < len(ranked) and done[first]:
+                        first += 1
+
+                    with self.lock:
+                        for (mtime, entry) in future.result():
+                            order += 1
+                            if len(self.heap) < self.count - len(self.found):
+                                heapq.heappush(self.heap, (mtime, -order, entry))
+                            elif self.heap and mtime > self.heap[0][0]:
+                                heapq.heapreplace(self.heap, (mtime, -order, entry))
+
+                        self.settle(limits[first] if first < len(ranked) else float("-inf"))
+        finally:
+            with self.lock:
+                if not self.stopped:
+                    self.settle(float("-inf"))
+                self.finished = True
+                self.lock.notify_all()
+
+    def settle(self, limit):
+        '''
+        moves every waiting entry newer than limit onto the end of the list,
+        and wakes up anyone waiting on it; call with the lock held
+
+        * entries already in the list stay put, even if a townie whose summary
+          was out of date turns up something newer later
+        '''
+
+        ranked = sorted(self.heap, reverse=True)
+        self.found.extend(entry for (mtime, order, entry) in ranked if mtime > limit)
+        self.heap = [candidate for candidate in ranked if candidate[0] <= limit]
+        heapq.heapify(self.heap)
+        self.lock.notify_all()
+
+def cancel(queued):
+    '''
+    cancels every future in queued that hasn't started running yet
+    '''
+
+    for future in queued:
+        future.cancel()
@@ -0,0 +1,152 @@
+"""
+This module contains the filesystem operations layer.
+
+Everything ttbp used to shell out to coreutils for (rm, mv, chmod, mkdir, ln,
+touch) is done here in-process with os and shutil, which saves a fork per
+file. Backup archives are written and read with tarfile by the backup module
+and core.process_backup().
+
+Every operation returns True if it worked and False if it didn't. Failures are
+reported on stderr the same way coreutils would have, and the exception is kept
+in LAST_ERROR for callers that want a closer look.
+"""
+import os
+import shutil
+import sys
+
+# the last error raised by an operation, if any
+LAST_ERROR = None
+
+def report(action, path, error):
+    '''
+    prints an error message for a failed operation, and remembers the error
+    '''
+
+    global LAST_ERROR
+
+    LAST_ERROR = error
+    reason = getattr(error, "strerror", None) or str(error)
+    sys.stderr.write("ttbp: cannot {action} '{path}': {reason}\n".format(
+        action=action, path=path, reason=reason))
+
+    return False
+
+def remove(path):
+    '''
+    removes a single file or symlink, like rm
+    '''
+
+    try:
+        os.remove(path)
+    except OSError as error:
+        return report("remove", path, error)
+
+    return True
+
+def remove_tree(path):
+    '''
+    removes a file, symlink, or whole directory tree, like rm -rf
+
+    * a path that doesn't exist is fine
+    * a symlink is removed without following it
+    '''
+
+    try:
+        if os.path.islink(path) or not os.path.isdir(path):
+            if os.path.lexists(path):
+                os.remove(path)
+        else:
+            shutil.rmtree(path)
+    except OSError as error:
+        return report("remove", path, error)
+
+    return True
+
+def move(source, destination):
+    '''
+    moves a file, like mv; if destination is a directory, source goes inside
+    it
+    '''
+
+    try:
+        shutil.move(source, destination)
+    except (OSError, shutil.Error) as error:
+        return report("move", source, error)
+
+    return True
+
+def chmod(path, mode):
+    '''
+    sets permissions on a path, like chmod; takes a numeric mode such as
+    0o600
+    '''
+
+    try:
+        os.chmod(path, mode)
+    except OSError as error:
+        return report("chmod", path, error)
+
+    return True
+
+def make_dir(path, mode=None):
+    '''
+    creates a directory, like mkdir
+
+    * if mode is given, the directory gets exactly those permissions,
+      regardless of umask
+    '''
+
+    try:
+        os.mkdir(path)
+        if mode is not None:
+            os.chmod(path, mode)
+    except OSError as error:
+        return report("create directory", path, error)
+
+    return True
+
+def ensure_dir(path, mode=None):
+    '''
+    creates a directory if it doesn't exist yet, then sets its permissions if
+    mode is given
+    '''
+
+    if not os.path.isdir(path):
+        return make_dir(path, mode)
+
+    if mode is not None:
+        return chmod(path, mode)
+
+    return True
+
+def symlink(target, link):
+    '''
+    creates a symlink at link pointing to target, like ln -s
+    '''
+
+    try:
+        os.symlink(target, link)
+    except OSError as error:
+        return report("create symlink", link, error)
+
+    return True
+
+def touch(path, mode=None):
+    '''
+    creates an empty file if it doesn't exist, or bumps its mtime if it does,
+    like touch
+
+    * if mode is given, a newly created file gets those permissions
+    '''
+
+    try:
+        if mode is None:
+            handle = os.open(path, os.O_WRONLY | os.O_CREAT)
+        else:
+            handle = os.open(path, os.O_WRONLY | os.O_CREAT, mode)
+        os.close(handle)
+        os.utime(path, None)
+    except OSError as error:
+        return report("touch", path, error)
+
+    return True
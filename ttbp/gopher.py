@@ -1,13 +1,18 @@
 """
 This module contains gopher-related stuff.
 """
+import collections
 import getpass
+import hashlib
+import json
 import os
 import time
-import subprocess
 
+from . import chatter
 from . import util
 from . import config
+from . import fsops
+from . import scanner
 #from .core import parse_date
 
 GOPHER_PROMPT = """
@@ -48,13 +53,29 @@ entries:
 
 """
 
+GOPHERMAP_SHARD_HEADER = """
+ {title}
+
+1(back)\t{back}
+
+"""
+
 
 def select_gopher():
     return util.input_yn(GOPHER_PROMPT)
 
-def publish_gopher(gopher_path, entry_filenames):
+def publish_gopher(gopher_path, entry_filenames, sharded=False):
     """This function (re)generates a user's list of feels posts in their gopher
-    directory and their gophermap."""
+    directory and their gophermap.
+
+    Only the difference between the given entries and what's already linked
+    gets touched: missing links are created, links to entries that are gone
+    (or nopub) are removed, and the gophermap is only rewritten if its
+    contents would change.
+
+    With sharded set, the root gophermap links to a gophermap per year, which
+    links to a gophermap per month, and only the shards whose entries changed
+    get regenerated."""
     entry_filenames = entry_filenames[:]  # force a copy since this might be shared state in core.py
     ttbp_gopher = os.path.join(
         os.path.expanduser('~/public_gopher'),
@@ -64,20 +85,149 @@ def publish_gopher(gopher_path, entry_filenames):
         print('\n\tERROR: something is wrong. your gopher directory is missing. re-enable gopher publishing from the settings menu to fix this up!')
         return
 
-    with open(os.path.join(ttbp_gopher, 'gophermap'), 'w') as gophermap:
-        gophermap.write(GOPHERMAP_HEADER.format(
-                        user=getpass.getuser()))
-        for entry_filename in entry_filenames:
-            filename = os.path.basename(entry_filename)
+    wanted = {}
+    for entry_filename in entry_filenames:
+        wanted[os.path.basename(entry_filename)] = entry_filename
+
+    linked = set()
+    for found in list(scanner.matches_links(ttbp_gopher)):
+        if found.name in wanted:
+            linked.add(found.name)
+        else:
+            os.unlink(found.path)
+
+    for filename in wanted:
+        if filename not in linked:
+            gopher_entry_symlink = os.path.join(ttbp_gopher, filename)
+            if not os.path.lexists(gopher_entry_symlink):
+                os.symlink(wanted[filename], gopher_entry_symlink)
+
+    if sharded:
+        publish_shards(ttbp_gopher, gopher_path, entry_filenames)
+        return
+
+    gophermap = [GOPHERMAP_HEADER.format(user=getpass.getuser())]
+    for entry_filename in entry_filenames:
+        label = "-".join(util.parse_date(entry_filename))
+        gophermap.append('0{file_label}\t{filename}\n'.format(
+            file_label=label,
+            filename=os.path.basename(entry_filename)))
+
+    write_gophermap(os.path.join(ttbp_gopher, 'gophermap'), gophermap)
+
+def publish_shards(ttbp_gopher, gopher_path, entry_filenames):
+    """Writes the sharded gophermap layout:
+
+    - {gopher_path}/gophermap lists the years
+    - {gopher_path}/YYYY/gophermap lists that year's months
+    - {gopher_path}/YYYY/MM/gophermap lists that month's entries
+
+    Each month's list of entries is fingerprinted, and the fingerprints are
+    kept in config.GOPHER_SHARDS. A month's gophermap is only regenerated if
+    its fingerprint moved (or if it doesn't exist yet), and a year's only if
+    one of its months was regenerated. Shards for months with no entries left
+    are removed."""
+    selector = "/~{user}/{path}".format(user=getpass.getuser(), path=gopher_path)
+
+    months = collections.OrderedDict()
+    for entry_filename in entry_filenames:
+        year, month, day = util.parse_date(entry_filename)
+        months.setdefault((year, month), []).append(entry_filename)
+
+    try:
+        with open(config.GOPHER_SHARDS, 'r') as shards:
+            old = json.load(shards)
+    except (IOError, OSError, ValueError):
+        old = {}
+
+    fingerprints = {}
+    dirty_years = set()
+
+    years = collections.OrderedDict()
+    for (year, month), entries in months.items():
+        years.setdefault(year, []).append(month)
+
+        key = year+"/"+month
+        fingerprints[key] = hashlib.sha256("\n".join(
+            os.path.basename(entry_filename) for entry_filename in entries).encode("utf-8")).hexdigest()
+
+        shard = os.path.join(ttbp_gopher, year, month)
+        if old.get(key) == fingerprints[key] and os.path.exists(os.path.join(shard, 'gophermap')):
+            continue
+
+        if not os.path.isdir(shard):
+            os.makedirs(shard)
+
+        gophermap = [GOPHERMAP_SHARD_HEADER.format(
+            title="{month} {year}".format(month=chatter.month(month), year=year),
+            back=selector+"/"+year)]
+        for entry_filename in entries:
+            gophermap.append('0{file_label}\t{selector}/{filename}\n'.format(
+                file_label="-".join(util.parse_date(entry_filename)),
+                selector=selector,
+                filename=os.path.basename(entry_filename)))
+
+        write_gophermap(os.path.join(shard, 'gophermap'), gophermap)
+        dirty_years.add(year)
+
+    for key in old:
+        if key not in fingerprints:
+            shard = os.path.join(ttbp_gopher, key)
+            try:
+                os.remove(os.path.join(shard, 'gophermap'))
+                os.rmdir(shard)
+            except OSError:
+                pass
+            dirty_years.add(key.split("/")[0])
+
+    for year in list(dirty_years):
+        if year not in years:
+            try:
+                os.remove(os.path.join(ttbp_gopher, year, 'gophermap'))
+                os.rmdir(os.path.join(ttbp_gopher, year))
+            except OSError:
+                pass
+
+    for year, year_months in years.items():
+        shard = os.path.join(ttbp_gopher, year)
+        if year not in dirty_years and os.path.exists(os.path.join(shard, 'gophermap')):
+            continue
+
+        gophermap = [GOPHERMAP_SHARD_HEADER.format(title=year, back=selector)]
+        for month in year_months:
+            gophermap.append('1{label}\t{selector}/{year}/{month}\n'.format(
+                label="{month} {year}".format(month=chatter.month(month), year=year),
+                selector=selector,
+                year=year,
+                month=month))
+
+        write_gophermap(os.path.join(shard, 'gophermap'), gophermap)
+
+    gophermap = [GOPHERMAP_HEADER.format(user=getpass.getuser())]
+    for year in years:
+        gophermap.append('1{year}\t{selector}/{year}\n'.format(
+            year=year,
+            selector=selector))
+
+    write_gophermap(os.path.join(ttbp_gopher, 'gophermap'), gophermap)
+
+    if fingerprints != old:
+        util.write_atomic(config.GOPHER_SHARDS, [json.dumps(fingerprints)])
+
+def write_gophermap(path, lines):
+    """Writes out a gophermap, unless it already has exactly these contents."""
+    contents = "".join(lines)
+
+    try:
+        with open(path, 'r') as gophermap:
+            if gophermap.read() == contents:
+                return False
+    except (IOError, OSError):
+        pass
 
-            gopher_entry_symlink = os.path.join(ttbp_gopher, os.path.basename(entry_filename))
-            if not os.path.exists(gopher_entry_symlink):
-                subprocess.call(["ln", "-s", entry_filename, gopher_entry_symlink])
+    util.write_atomic(path, [contents])
 
-            label = "-".join(util.parse_date(entry_filename))
-            gophermap.write('0{file_label}\t{filename}\n'.format(
-                file_label=label,
-                filename=filename))
+    return True
 
 def setup_gopher(gopher_path):
     """Given a path relative to ~/public_gopher, this function:
@@ -107,12 +257,12 @@ def setup_gopher(gopher_path):
     if not os.path.isdir(gopher_entries):
         os.makedirs(gopher_entries)
 
-    subprocess.call(["ln", "-s", gopher_entries, ttbp_gopher])
+    fsops.symlink(gopher_entries, ttbp_gopher)
 
 def unpublish():
     """blanks all gopher things and recreates the directories."""
 
-    subprocess.call(["rm", "-rf", config.GOPHER_PATH])
-    subprocess.call(["rm", "-rf", config.GOPHER_ENTRIES])
-    os.mkdir(config.GOPHER_ENTRIES)
-    subprocess.call(["ln", "-s", config.GOPHER_ENTRIES, config.GOPHER_PATH])
+    fsops.remove_tree(config.GOPHER_PATH)
+    fsops.remove_tree(config.GOPHER_ENTRIES)
+    fsops.make_dir(config.GOPHER_ENTRIES)
+    fsops.symlink(config.GOPHER_ENTRIES, config.GOPHER_PATH)
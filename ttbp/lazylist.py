@@ -0,0 +1,109 @@
+"""
+This module contains the lazy list used for entry listings.
+
+A LazyList looks like a read-only list to the menu code (it has a length, and
+can be indexed and sliced), but each item is only worked out the first time
+it's asked for. Listing someone's feels then only costs a directory listing up
+front; word counts and timestamps get read for the page that's actually on
+screen, and the page after that is worked out in the background while the
+user is looking at this one.
+
+The keys can themselves still be filling in (a feed.FeedStream, say); the
+list then grows with them, and wait() lets the menu code block until there's
+enough to show a page.
+"""
+import threading
+
+class LazyList(object):
+    '''
+    a read-only list of load(key) for each of the given keys, computed on
+    first access and cached after that
+
+    * slicing out a page also starts a background prefetch of the next page
+      of the same size
+    '''
+
+    def __init__(self, keys, load):
+        self.keys = keys
+        self.load = load
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.get(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            items = [self.get(position) for position in range(start, stop, step)]
+            self.prefetch(stop, stop + (stop - start))
+            return items
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("lazy list index out of range")
+
+        return self.get(index)
+
+    def wait(self, count):
+        '''
+        if the keys are still filling in, blocks until there are at least count
+        of them; returns True if more may still be coming
+        '''
+
+        wait = getattr(self.keys, "wait", None)
+
+        if wait is None:
+            return False
+
+        return wait(count)
+
+    def get(self, index):
+        '''
+        returns the item at the given (non-negative) index, loading it if it
+        hasn't been yet
+        '''
+
+        with self.lock:
+            if index in self.cache:
+                return self.cache[index]
+
+        item = self.load(self.keys[index])
+
+        with self.lock:
+            return self.cache.setdefault(index, item)
+
+    def prefetch(self, start, stop):
+        '''
+        loads the items from start up to stop on a background thread, unless
+        a prefetch is already running
+        '''
+
+        stop = min(stop, len(self))
+
+        if start >= stop:
+            return
+
+        if self.worker is not None and self.worker.is_alive():
+            return
+
+        self.worker = threading.Thread(target=self.fill, args=(start, stop), name="ttbp prefetch")
+        self.worker.daemon = True
+        self.worker.start()
+
+    def fill(self, start, stop):
+        '''
+        prefetch worker; errors are left for the foreground to run into
+        '''
+
+        for index in range(start, stop):
+            try:
+                self.get(index)
+            except Exception:
+                return
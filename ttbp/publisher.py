@@ -0,0 +1,140 @@
+"""
+This module contains the background publisher.
+
+When "background publishing" is turned on, publish transactions hand their
+rebuilds to a worker thread instead of running them in the foreground, so the
+menu comes back right away no matter how big the archive is. Requests go
+through a small bounded queue; the worker waits a moment after each one and
+merges anything else that shows up, so a burst of requests turns into a single
+rebuild.
+
+stop() must be called before exiting, so that pending rebuilds get finished.
+A rebuild that fails doesn't take the worker down; its exception is kept for
+the menus to report, through take_error().
+"""
+import threading
+
+from six.moves import queue
+
+# how many requests can be waiting before submit() blocks
+QUEUE_SIZE = 8
+
+# seconds to wait for more requests before rebuilding
+DEBOUNCE = 0.5
+
+QUEUE = None
+WORKER = None
+
+# the last exception raised by a rebuild, if any
+LAST_ERROR = None
+
+STOP = "stop"
+
+def start(flush):
+    '''
+    starts the worker thread, which calls flush(html, gophermap, global_feed)
+    to do each rebuild
+    '''
+
+    global QUEUE
+    global WORKER
+
+    if WORKER is not None and WORKER.is_alive():
+        return
+
+    QUEUE = queue.Queue(QUEUE_SIZE)
+    WORKER = threading.Thread(target=work, args=(QUEUE, flush), name="ttbp publisher")
+    WORKER.daemon = True
+    WORKER.start()
+
+def running():
+    '''
+    returns True if the worker thread is up
+    '''
+
+    return WORKER is not None and WORKER.is_alive()
+
+def submit(html=True, gophermap=True, global_feed=False):
+    '''
+    queues a rebuild request for the worker
+    '''
+
+    QUEUE.put((html, gophermap, global_feed))
+
+def work(requests, flush):
+    '''
+    worker loop; merges requests that arrive close together and runs one
+    rebuild for each batch
+    '''
+
+    global LAST_ERROR
+
+    while True:
+        request = requests.get()
+        if request == STOP:
+            requests.task_done()
+            return
+
+        html, gophermap, global_feed = request
+        batch = 1
+        stopping = False
+
+        while True:
+            try:
+                request = requests.get(timeout=DEBOUNCE)
+            except queue.Empty:
+                break
+
+            batch += 1
+            if request == STOP:
+                stopping = True
+                break
+
+            html = html or request[0]
+            gophermap = gophermap or request[1]
+            global_feed = global_feed or request[2]
+
+        try:
+            flush(html, gophermap, global_feed)
+        except Exception as error:
+            LAST_ERROR = error
+
+        for done in range(batch):
+            requests.task_done()
+
+        if stopping:
+            return
+
+def take_error():
+    '''
+    returns the exception from the last failed rebuild, if any, and clears it
+    '''
+
+    global LAST_ERROR
+
+    error = LAST_ERROR
+    LAST_ERROR = None
+
+    return error
+
+def wait():
+    '''
+    blocks until every queued request has been rebuilt
+    '''
+
+    if running():
+        QUEUE.join()
+
+def stop():
+    '''
+    finishes any pending rebuilds, then shuts down the worker thread
+    '''
+
+    global WORKER
+
+    if not running():
+        return
+
+    QUEUE.put(STOP)
+    WORKER.join()
+    WORKER = None
@@ -0,0 +1,121 @@
+"""
+This module contains the entry directory scanner.
+
+Everything that walks an entries directory goes through here. Directories are
+read with os.scandir, names are checked against a precompiled YYYYMMDD.txt
+pattern, and each entry comes back as an Entry record carrying the one stat
+result taken for it.
+"""
+import collections
+import os
+import re
+
+ENTRY_NAME = re.compile(r'^((19|20)\d{2})(0[1-9]|1[0-2])(0[1-9]|1\d|2\d|3[01])\.txt$')
+
+# name: 'YYYYMMDD.txt'
+# path: full path to the entry
+# date: 'YYYYMMDD'
+# stat: os.stat_result for the entry
+Entry = collections.namedtuple("Entry", ["name", "path", "date", "stat"])
+
+def valid(filename):
+    '''
+    checks if the filename is YYYYMMDD.txt
+    '''
+
+    return ENTRY_NAME.match(os.path.basename(filename)) is not None
+
+def matches(directory):
+    '''
+    yields os.DirEntry objects for every validly named regular file in the
+    given directory, without stat'ing any of them; yields nothing if the
+    directory can't be read
+    '''
+
+    try:
+        listing = os.scandir(directory)
+    except OSError:
+        return
+
+    with listing:
+        for found in listing:
+            if ENTRY_NAME.match(found.name) is None:
+                continue
+            try:
+                if not found.is_file():
+                    continue
+            except OSError:
+                continue
+            yield found
+
+def matches_links(directory):
+    '''
+    yields os.DirEntry objects for every validly named symlink in the given
+    directory, whether or not it still points anywhere
+    '''
+
+    try:
+        listing = os.scandir(directory)
+    except OSError:
+        return
+
+    with listing:
+        for found in listing:
+            if ENTRY_NAME.match(found.name) is None:
+                continue
+            try:
+                if not found.is_symlink():
+                    continue
+            except OSError:
+                continue
+            yield found
+
+def record(found):
+    '''
+    turns an os.DirEntry into an Entry, or None if it vanished before it could
+    be stat'ed
+    '''
+
+    try:
+        stat = found.stat()
+    except OSError:
+        return None
+
+    return Entry(found.name, found.path, found.name[:8], stat)
+
+def scan(directory):
+    '''
+    yields an Entry for every validly named entry in the given directory, in
+    no particular order
+    '''
+
+    for found in matches(directory):
+        entry = record(found)
+        if entry is not None:
+            yield entry
+
+def entries(directory):
+    '''
+    returns a list of Entry records for the given directory, sorted by date
+    '''
+
+    return sorted(scan(directory), key=lambda entry: entry.name)
+
+def latest(directory):
+    '''
+    returns the Entry for the most recent entry in the given directory, or
+    None if there isn't one
+
+    * only the most recent entry gets stat'ed
+    '''
+
+    last = None
+
+    for found in matches(directory):
+        if last is None or found.name > last.name:
+            last = found
+
+    if last is None:
+        return None
+
+    return record(last)
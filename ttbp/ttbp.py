@@ -45,10 +45,15 @@ from six.moves import input
 
 import inflect
 
+from . import backup
 from . import config
 from . import core
 from . import chatter
+from . import feed
+from . import fsops
 from . import gopher
+from . import lazylist
+from . import scanner
 from . import util
 
 __version__ = "0.12.2"
@@ -77,6 +82,14 @@ DEFAULT_SETTINGS = {
         "post as nopub": False,
     }
 
+# settings that are quietly given their default if they're missing, instead of
+# sending the user through setup_repair()
+OPTIONAL_SETTINGS = {
+        "background publishing": False,
+        "gopher shards": False,
+        "page size": 0,
+    }
+
 ## user globals
 SETTINGS = {
         "editor": "nano",
@@ -85,6 +98,9 @@ SETTINGS = {
         "publishing": False,
         "rainbows": False,
         "post as nopub": False,
+        "background publishing": False,
+        "gopher shards": False,
+        "page size": 0,
         }
 
 ## ttbp specific utilities
@@ -98,12 +114,7 @@ def menu_handler(options, prompt, pagify=10, page=0, rainbow=False, top=""):
     'top' is an optional list topper, to be passed to redraw()
     '''
 
-    optCount = len(options)
-    total = optCount / pagify
-
-    # don't display empty pages
-    if optCount % pagify == 0:
-        total = total - 1
+    total = page_total(len(options), pagify)
 
     if 0:
     # temporary fix for menu bug when fewer than 10 entries
@@ -112,7 +123,15 @@ def menu_handler(options, prompt, pagify=10, page=0, rainbow=False, top=""):
         return util.list_select(options, prompt)
 
     else:
-        return page_helper(options, prompt, pagify, rainbow, page, int(total), top)
+        return page_helper(options, prompt, pagify, rainbow, page, total, top)
+
+def page_total(count, pagify):
+    '''
+    returns the index of the last page for a list of count options, without
+    counting an empty page at the end
+    '''
+
+    return (count - 1) // pagify
 
 def page_helper(options, prompt, pagify, rainbow, page, total, top):
     '''
@@ -122,42 +141,57 @@ def page_helper(options, prompt, pagify, rainbow, page, total, top):
     'page' is the current page number
     'total' is the total number of pages
     'top' is displyed after the banner redraw
+
+    options that are still filling in (see lazylist.LazyList.wait) are waited
+    on just long enough to show the current page, and the page count is
+    marked with a + while more may be coming
     '''
 
-    ## make short list
-    x = 0 + page * pagify
-    y = x + pagify
-    optPage = options[x:y]
+    while True:
+        ## make short list
+        x = 0 + page * pagify
+        y = x + pagify
 
-    util.print_menu(optPage, SETTINGS.get("rainbows", False))
-    print("\n\t( page {page} of {total}; type 'u' or 'd' to scroll up and down)".format(page=page+1, total=total+1))
+        more = False
+        if hasattr(options, "wait"):
+            more = options.wait(y)
+            total = page_total(len(options), pagify)
+            page = max(min(page, total), 0)
+            x = 0 + page * pagify
+            y = x + pagify
 
-    ans = util.list_select(optPage, prompt)
+        optPage = options[x:y]
 
-    if ans in util.NAVS:
-        error = ""
-        if ans == 'u':
-            if page == 0:
-                error = "can't scroll up anymore!\n\n> "
-            else:
-                page = page - 1
-        else:
-            if page == total:
-                error = "can't scroll down anymore!\n\n> "
+        util.print_menu(optPage, SETTINGS.get("rainbows", False))
+        print("\n\t( page {page} of {total}{more}; type 'u' or 'd' to scroll up and down)".format(page=page+1,
+            total=total+1, more="+" if more else ""))
+
+        ans = util.list_select(optPage, prompt)
+
+        if ans in util.NAVS:
+            error = ""
+            if ans == 'u':
+                if page == 0:
+                    error = "can't scroll up anymore!\n\n> "
+                else:
+                    page = page - 1
             else:
-                page = page + 1
-        redraw(error+top)
-        return page_helper(options, prompt, pagify, rainbow, page, total, top)
+                if page == total and not more:
+                    error = "can't scroll down anymore!\n\n> "
+                else:
+                    page = page + 1
+            redraw(error+top)
+            continue
 
-    elif ans is False:
-        return ans
+        elif ans is False:
+            return ans
 
-    else:
-        # shift answer to refer to index from original list
-        ans = ans + page * pagify
-        # return the (shifted) answer and the current page
-        # alternatively, we can recompute the current page at a call site
-        return (page, ans)
+        else:
+            # shift answer to refer to index from original list
+            ans = ans + page * pagify
+            # return the (shifted) answer and the current page
+            # alternatively, we can recompute the current page at a call site
+            return (page, ans)
 
 def redraw(leftover=""):
     '''
@@ -169,9 +203,27 @@ def redraw(leftover=""):
     os.system("clear")
     print(BANNER)
     print(SPACER)
+    failed = publish_failure()
+    if failed:
+        print("> {failed}\n".format(failed=failed))
     if leftover:
         print("> {leftover}\n".format(leftover=leftover))
 
+def publish_failure():
+    '''
+    returns a warning if a background rebuild has failed since the last time
+    one was shown, otherwise an empty string
+    '''
+
+    error = core.publish_error()
+
+    if error is None:
+        return ""
+
+    return ("background publishing failed ({name}: {error}); your feels are saved, "
+            "but your published pages might be out of date until the next successful "
+            "publish.").format(name=type(error).__name__, error=error)
+
 def main():
     '''
     main engine head
@@ -189,7 +241,8 @@ just keep in mind that you might lose anything you've started here.\
 """)
 
     try:
-        print(check_init())
+        with core.publish_transaction():
+            print(check_init())
     except EOFError:
         print(stop())
         return
@@ -209,10 +262,17 @@ just keep in mind that you might lose anything you've started here.\
 
 def stop():
     '''
-    returns an exit message.
+    returns an exit message, after finishing any background publishing and
+    warning about any background rebuild that failed.
     '''
 
-    return "\n\n\t"+chatter.say("bye")+"\n\n"
+    core.finish_publish()
+
+    failed = publish_failure()
+    if failed:
+        failed = "\n\n> "+failed
+
+    return failed+"\n\n\t"+chatter.say("bye")+"\n\n"
 
 def check_init():
     '''
@@ -272,9 +332,9 @@ def init():
 
     ## make .ttbp directory structure
     print("\ngenerating feels at {path}...".format(path=config.PATH).rstrip())
-    subprocess.call(["mkdir", config.PATH])
-    subprocess.call(["mkdir", config.USER_CONFIG])
-    subprocess.call(["mkdir", config.MAIN_FEELS])
+    fsops.make_dir(config.PATH)
+    fsops.make_dir(config.USER_CONFIG)
+    fsops.make_dir(config.MAIN_FEELS)
 
     versionFile = os.path.join(config.PATH, "version")
     open(versionFile, "w").write(__version__)
@@ -379,6 +439,9 @@ def load_user_settings():
     except ValueError:
         return False
 
+    for option in OPTIONAL_SETTINGS:
+        SETTINGS.setdefault(option, OPTIONAL_SETTINGS[option])
+
     core.load(SETTINGS)
 
     return SETTINGS
@@ -433,86 +496,112 @@ def setup():
 
     global SETTINGS
 
-    menuOptions = []
-    settingList = sorted(list(SETTINGS))
+    while True:
+        menuOptions = []
+        settingList = sorted(list(SETTINGS))
 
-    for setting in settingList:
-        menuOptions.append(setting + ": \t" + str(SETTINGS.get(setting)))
-    util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
+        for setting in settingList:
+            menuOptions.append(setting + ": \t" + str(SETTINGS.get(setting)))
+        util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
 
-    try:
-        choice = input("\npick a setting to change (or type 'q' to exit): ")
-    except KeyboardInterrupt:
-        redraw(EJECT)
-        return SETTINGS
-
-    if choice is not "":
-
-        if choice in QUITS:
-            redraw()
+        try:
+            choice = input("\npick a setting to change (or type 'q' to exit): ")
+        except KeyboardInterrupt:
+            redraw(EJECT)
             return SETTINGS
 
-        # editor selection
-        if settingList[int(choice)] == "editor":
-            SETTINGS.update({"editor": select_editor()})
-            redraw("text editor set to: {editor}".format(editor=SETTINGS["editor"]))
-            save_settings()
-            return setup()
-
-        # publishing selection
-        elif settingList[int(choice)] == "publishing":
-            SETTINGS.update({"publishing":select_publishing()})
-            core.reload_ttbprc(SETTINGS)
-            update_publishing()
-            redraw("publishing set to {publishing}".format(publishing=SETTINGS.get("publishing")))
-            save_settings()
-            return setup()
-
-        # publish dir selection
-        elif settingList[int(choice)] == "publish dir":
-            publish_dir = select_publish_dir()
-            SETTINGS.update({"publish dir": publish_dir})
-            #update_publishing()
-
-            if publish_dir is None:
-                redraw("sorry, i can't set a publish directory for you if you don't have html publishing enabled. please enable publishing to continue.")
-            else:
-                redraw("publishing your entries to {url}/index.html".format(
-                    url="/".join([config.LIVE+config.USER,
-                            str(SETTINGS.get("publish dir"))])))
-            save_settings()
-            return setup()
-
-        # gopher opt-in
-        elif settingList[int(choice)] == "gopher":
-            SETTINGS.update({'gopher': gopher.select_gopher()})
-            redraw('gopher publishing set to: {gopher}'.format(gopher=SETTINGS['gopher']))
-            update_gopher()
-            save_settings()
-            return setup()
-
-        # rainbow menu selection
-        elif settingList[int(choice)] == "rainbows":
-            SETTINGS.update({"rainbows": toggle_rainbows()})
-            redraw("rainbow menus set to {rainbow}".format(rainbow=SETTINGS.get("rainbows")))
-            save_settings()
-            return setup()
-
-        #nopub toggling
-        elif settingList[int(choice)] == "post as nopub":
-            SETTINGS.update({"post as nopub": toggle_pub_default()})
-            redraw("posting default set to {nopub}".format(nopub=SETTINGS.get("post as nopub")))
-            save_settings()
-            return setup()
-
-        input("\nyou're all good to go, {friend}! hit <enter> to continue.\n\n".format(friend=chatter.say("friend")))
-        redraw()
+        if choice is not "":
+
+            if choice in QUITS:
+                redraw()
+                return SETTINGS
+
+            # editor selection
+            if settingList[int(choice)] == "editor":
+                SETTINGS.update({"editor": select_editor()})
+                redraw("text editor set to: {editor}".format(editor=SETTINGS["editor"]))
+                save_settings()
+                continue
+
+            # publishing selection
+            elif settingList[int(choice)] == "publishing":
+                SETTINGS.update({"publishing":select_publishing()})
+                core.reload_ttbprc(SETTINGS)
+                update_publishing()
+                redraw("publishing set to {publishing}".format(publishing=SETTINGS.get("publishing")))
+                save_settings()
+                continue
+
+            # publish dir selection
+            elif settingList[int(choice)] == "publish dir":
+                publish_dir = select_publish_dir()
+                SETTINGS.update({"publish dir": publish_dir})
+                #update_publishing()
+
+                if publish_dir is None:
+                    redraw("sorry, i can't set a publish directory for you if you don't have html publishing enabled. please enable publishing to continue.")
+                else:
+                    redraw("publishing your entries to {url}/index.html".format(
+                        url="/".join([config.LIVE+config.USER,
+                                str(SETTINGS.get("publish dir"))])))
+                save_settings()
+                continue
+
+            # gopher opt-in
+            elif settingList[int(choice)] == "gopher":
+                SETTINGS.update({'gopher': gopher.select_gopher()})
+                redraw('gopher publishing set to: {gopher}'.format(gopher=SETTINGS['gopher']))
+                update_gopher()
+                save_settings()
+                continue
+
+            # rainbow menu selection
+            elif settingList[int(choice)] == "rainbows":
+                SETTINGS.update({"rainbows": toggle_rainbows()})
+                redraw("rainbow menus set to {rainbow}".format(rainbow=SETTINGS.get("rainbows")))
+                save_settings()
+                continue
+
+            #nopub toggling
+            elif settingList[int(choice)] == "post as nopub":
+                SETTINGS.update({"post as nopub": toggle_pub_default()})
+                redraw("posting default set to {nopub}".format(nopub=SETTINGS.get("post as nopub")))
+                save_settings()
+                continue
+
+            # background publishing toggling
+            elif settingList[int(choice)] == "background publishing":
+                SETTINGS.update({"background publishing": toggle_background()})
+                redraw("background publishing set to {background}".format(background=SETTINGS.get("background publishing")))
+                save_settings()
+                continue
+
+            # gopher sharding toggling
+            elif settingList[int(choice)] == "gopher shards":
+                SETTINGS.update({"gopher shards": toggle_shards()})
+                core.reload_ttbprc(SETTINGS)
+                core.request_publish(html=False)
+                redraw("gopher shards set to {shards}".format(shards=SETTINGS.get("gopher shards")))
+                save_settings()
+                continue
+
+            # index page size selection
+            elif settingList[int(choice)] == "page size":
+                SETTINGS.update({"page size": select_page_size()})
+                core.reload_ttbprc(SETTINGS)
+                core.request_publish(gophermap=False)
+                redraw("page size set to {size}".format(size=SETTINGS.get("page size")))
+                save_settings()
+                continue
+
+            input("\nyou're all good to go, {friend}! hit <enter> to continue.\n\n".format(friend=chatter.say("friend")))
+            redraw()
 
-        return SETTINGS
+            return SETTINGS
 
-    else:
-        redraw("now changing your settings. press <ctrl-c> if you didn't mean to do this.")
-        return setup()
+        else:
+            redraw("now changing your settings. press <ctrl-c> if you didn't mean to do this.")
+            continue
 
 def save_settings():
     """
@@ -542,59 +631,61 @@ def main_menu():
             "see credits",
             "read documentation"]
 
-    print("you're at ttbp home. remember, you can always press <ctrl-c> to come back here.\n")
-    util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
-
-    try:
-        choice = input("\ntell me about your feels (or type 'q' to exit): ")
-    except KeyboardInterrupt:
-        redraw(EJECT)
-        return main_menu()
+    while True:
+        print("you're at ttbp home. remember, you can always press <ctrl-c> to come back here.\n")
+        util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
 
-    if choice == '0':
-        redraw()
-        today = time.strftime("%Y%m%d")
-        write_entry(os.path.join(config.MAIN_FEELS, today+".txt"))
-        core.www_neighbors()
-    elif choice == '1':
-        intro = "here are some options for managing your feels:"
-        redraw(intro)
-        review_menu(intro)
-        core.load_files()
-    elif choice == '2':
-        users = core.find_ttbps()
-        prompt = "the following {usercount} {are} recording feels on ttbp:".format(
-                usercount=p.no("user", len(users)),
-                are=p.plural("is", len(users)))
-        redraw(prompt)
-        view_neighbors(users, prompt)
-    elif choice == '3':
-        redraw("most recent global entries")
-        view_global_feed()
-    elif choice == '4':
-        intro = "your subscriptions list is private; no one but you will know who you're following.\n\n> here are some options for your subscriptions:"
-        redraw(intro)
-        subscription_handler(intro)
-    elif choice == '5':
-        graffiti_handler()
-    elif choice == '6':
-        redraw("now changing your settings. press <ctrl-c> if you didn't mean to do this.")
-        core.load(setup()) # reload settings to core
-    elif choice == '7':
-        redraw("you're about to send mail to ~endorphant about ttbp")
-        feedback_menu()
-    elif choice == '8':
-        redraw()
-        show_credits()
-    elif choice == '9':
-        subprocess.call(["lynx", os.path.join(config.INSTALL_PATH, "..", "doc", "manual.html")])
-        redraw()
-    elif choice in QUITS:
-        return stop()
-    else:
-        redraw(INVALID)
+        try:
+            choice = input("\ntell me about your feels (or type 'q' to exit): ")
+        except KeyboardInterrupt:
+            redraw(EJECT)
+            continue
 
-    return main_menu()
+        if choice in QUITS:
+            return stop()
+
+        # everything an action publishes gets flushed once, when it's done
+        with core.publish_transaction():
+            if choice == '0':
+                redraw()
+                today = time.strftime("%Y%m%d")
+                write_entry(os.path.join(config.MAIN_FEELS, today+".txt"))
+                core.request_publish(html=False, gophermap=False, global_feed=True)
+            elif choice == '1':
+                intro = "here are some options for managing your feels:"
+                redraw(intro)
+                review_menu(intro)
+                core.load_files()
+            elif choice == '2':
+                users = core.find_ttbps()
+                prompt = "the following {usercount} {are} recording feels on ttbp:".format(
+                        usercount=p.no("user", len(users)),
+                        are=p.plural("is", len(users)))
+                redraw(prompt)
+                view_neighbors(users, prompt)
+            elif choice == '3':
+                redraw("most recent global entries")
+                view_global_feed()
+            elif choice == '4':
+                intro = "your subscriptions list is private; no one but you will know who you're following.\n\n> here are some options for your subscriptions:"
+                redraw(intro)
+                subscription_handler(intro)
+            elif choice == '5':
+                graffiti_handler()
+            elif choice == '6':
+                redraw("now changing your settings. press <ctrl-c> if you didn't mean to do this.")
+                core.load(setup()) # reload settings to core
+            elif choice == '7':
+                redraw("you're about to send mail to ~endorphant about ttbp")
+                feedback_menu()
+            elif choice == '8':
+                redraw()
+                show_credits()
+            elif choice == '9':
+                subprocess.call(["lynx", os.path.join(config.INSTALL_PATH, "..", "doc", "manual.html")])
+                redraw()
+            else:
+                redraw(INVALID)
 
 def feedback_menu():
     '''
@@ -604,24 +695,23 @@ def feedback_menu():
     * calls feedback writing function
     '''
 
-    util.print_menu(SUBJECTS, SETTINGS.get("rainbows", False))
-    choice = input("\npick a category for your feedback: ")
+    while True:
+        util.print_menu(SUBJECTS, SETTINGS.get("rainbows", False))
+        choice = input("\npick a category for your feedback: ")
 
-    cat = ""
-    if choice in ['0', '1', '2', '3']:
-        cat = SUBJECTS[int(choice)]
-        entered = input("""
+        cat = ""
+        if choice in ['0', '1', '2', '3']:
+            cat = SUBJECTS[int(choice)]
+            entered = input("""
 composing a {mail_category} to ~endorphant.
 
 press <enter> to open an external text editor. mail will be sent once you save and quit.
 
 """.format(mail_category=cat))
-        redraw(send_feedback(entered, cat))
-        return
-    else:
-        redraw(INVALID)
-
-    return feedback_menu()
+            redraw(send_feedback(entered, cat))
+            return
+        else:
+            redraw(INVALID)
 
 def review_menu(intro=""):
     '''
@@ -631,6 +721,7 @@ def review_menu(intro=""):
     menuOptions = [
             "read over feels",
             "modify feels publishing",
+            "modify publishing for many feels",
             "backup your feels",
             "import a feels backup",
             "bury some feels",
@@ -639,113 +730,118 @@ def review_menu(intro=""):
             "wipe feels account"
             ]
 
-    util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
-
-    choice = util.list_select(menuOptions, "what would you like to do with your feels? (or 'q' to return home) ")
-
-    top = ""
-    hasfeels = len(os.listdir(config.MAIN_FEELS)) > 0
-    nofeels = "you don't have any feels to work with, "+chatter.say("friend")+"\n\n> "
-
-    if choice is not False:
-        if choice == 0:
-            if hasfeels:
-                redraw("your recorded feels, listed by date:")
-                view_feels(config.USER)
-            else:
-                top = nofeels
-        elif choice == 1:
-            if hasfeels:
-                redraw("publishing status of your feels:")
-                list_nopubs(config.USER)
-            else:
-                top = nofeels
-        elif choice == 2:
-            if hasfeels:
-                redraw("FEELS BACKUP")
-                backup_feels()
-            else:
-                top = nofeels
-        elif choice == 3:
-            redraw("loading feels backup")
-            load_backup()
-        elif choice == 4:
-            if hasfeels:
-                redraw("burying feels")
-                bury_feels()
-            else:
-                top = nofeels
-        elif choice == 5:
-            if hasfeels:
-                redraw("deleting feels")
-                delete_feels()
-            else:
-                top = nofeels
-        elif choice == 6:
-            if hasfeels:
-                redraw("!!!PURGING ALL FEELS!!!")
-                purge_feels()
-            else:
-                top = nofeels
-        elif choice == 7:
-            redraw("!!! WIPING FEELS ACCOUNT !!!")
-            wipe_account()
-    else:
-        redraw()
-        return
+    while True:
+        util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
+
+        choice = util.list_select(menuOptions, "what would you like to do with your feels? (or 'q' to return home) ")
+
+        top = ""
+        hasfeels = len(os.listdir(config.MAIN_FEELS)) > 0
+        nofeels = "you don't have any feels to work with, "+chatter.say("friend")+"\n\n> "
+
+        if choice is not False:
+            if choice == 0:
+                if hasfeels:
+                    redraw("your recorded feels, listed by date:")
+                    view_feels(config.USER)
+                else:
+                    top = nofeels
+            elif choice == 1:
+                if hasfeels:
+                    redraw("publishing status of your feels:")
+                    list_nopubs(config.USER)
+                else:
+                    top = nofeels
+            elif choice == 2:
+                if hasfeels:
+                    redraw("publishing status of many feels:")
+                    bulk_nopubs()
+                else:
+                    top = nofeels
+            elif choice == 3:
+                if hasfeels:
+                    redraw("FEELS BACKUP")
+                    backup_feels()
+                else:
+                    top = nofeels
+            elif choice == 4:
+                redraw("loading feels backup")
+                load_backup()
+            elif choice == 5:
+                if hasfeels:
+                    redraw("burying feels")
+                    bury_feels()
+                else:
+                    top = nofeels
+            elif choice == 6:
+                if hasfeels:
+                    redraw("deleting feels")
+                    delete_feels()
+                else:
+                    top = nofeels
+            elif choice == 7:
+                if hasfeels:
+                    redraw("!!!PURGING ALL FEELS!!!")
+                    purge_feels()
+                else:
+                    top = nofeels
+            elif choice == 8:
+                redraw("!!! WIPING FEELS ACCOUNT !!!")
+                wipe_account()
+        else:
+            redraw()
+            return
 
-    redraw(top+intro)
-    return review_menu(intro)
+        redraw(top+intro)
 
 def subscription_handler(intro=""):
     '''
     submenu for managing subscriptions
     '''
 
-    if not os.path.exists(config.SUBS):
-        subprocess.call(["touch", config.SUBS])
-        subprocess.call(["chmod", "600", config.SUBS])
+    while True:
+        if not os.path.exists(config.SUBS):
+            fsops.touch(config.SUBS, 0o600)
 
-    subs_raw = []
-    if os.path.isfile(config.SUBS):
-        for line in open(config.SUBS, "r"):
-            subs_raw.append(line.rstrip())
+        subs_raw = []
+        if os.path.isfile(config.SUBS):
+            for line in open(config.SUBS, "r"):
+                subs_raw.append(line.rstrip())
 
-    subs = []
-    all_users = core.find_ttbps()
-    for name in subs_raw:
-        if name in all_users:
-            subs.append(name)
+        subs = []
+        all_users = core.ttbp_users()
+        for name in subs_raw:
+            if name in all_users:
+                subs.append(name)
 
-    menuOptions = [
-            "view subscribed feed",
-            "manage subscriptions"
-            ]
+        menuOptions = [
+                "view subscribed feed",
+                "manage subscriptions"
+                ]
 
-    util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
+        util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
 
-    choice = util.list_select(menuOptions, "what would you like to do with your subscriptions? (or 'q' to return home) ")
+        choice = util.list_select(menuOptions, "what would you like to do with your subscriptions? (or 'q' to return home) ")
 
-    top = ""
+        top = ""
 
-    if choice is not False:
-        if choice == 0:
-            if len(subs) > 0:
-                prompt = "most recent entries from your subscribed pals:"
+        if choice is not False:
+            if choice == 0:
+                if len(subs) > 0:
+                    prompt = "most recent entries from your subscribed pals:"
+                    redraw(prompt)
+                    view_subscribed_feed(subs, prompt)
+                else:
+                    intro = "it doesn't look like you have any subscriptions to see! add pals with 'manage subscriptions' here."
+            elif choice == 1:
+                prompt = "options for managing your subscriptions:"
                 redraw(prompt)
-                view_subscribed_feed(subs, prompt)
-            else:
-                intro = "it doesn't look like you have any subscriptions to see! add pals with 'manage subscriptions' here."
-        elif choice == 1:
-            prompt = "options for managing your subscriptions:"
-            redraw(prompt)
-            subscription_manager(subs, prompt)
-    else:
-        redraw()
-        return
+                subscription_manager(subs, prompt)
+        else:
+            redraw()
+            return
 
-    redraw(top+intro)
-    return subscription_handler(intro)
+        redraw(top+intro)
 
 def view_neighbors(users, prompt, page=0):
     '''
@@ -758,7 +854,7 @@ def view_neighbors(users, prompt, page=0):
 
     ## assumes list of users passed in all have valid config files
     for user in users:
-        userRC = json.load(open(os.path.join("/home", user, ".ttbp", "config", "ttbprc")))
+        userRC = core.user_settings(user)
 
         ## retrieve publishing url, if it exists
         url="\t\t\t"
@@ -766,20 +862,12 @@ def view_neighbors(users, prompt, page=0):
             url = config.LIVE+user+"/"+userRC.get("publish dir")
 
         ## find last entry
-        try:
-            files = os.listdir(os.path.join("/home", user, ".ttbp", "entries"))
-        except OSError:
-            files = []
-        files.sort()
-        lastfile = ""
-        for filename in files:
-            if core.valid(filename):
-                lastfile = os.path.join("/home", user, ".ttbp", "entries", filename)
+        lastfile = feed.last_entry(user)
 
         ## generate human-friendly timestamp
         ago = "never"
         if lastfile:
-            last = os.path.getctime(lastfile)
+            last = lastfile[1]
             since = time.time()-last
             ago = util.pretty_time(int(since)) + " ago"
         else:
@@ -806,16 +894,16 @@ def view_neighbors(users, prompt, page=0):
         sortedUsers.append(user[0])
         userIndex.append(user[2])
 
-    ans = menu_handler(sortedUsers, "pick a townie to browse their feels, or type 'q' to go home: ", 15, page, SETTINGS.get("rainbows", False), prompt)
+    while True:
+        ans = menu_handler(sortedUsers, "pick a townie to browse their feels, or type 'q' to go home: ", 15, page, SETTINGS.get("rainbows", False), prompt)
 
-    if ans is not False:
-        (page, choice) = ans
-        redraw("~{user}'s recorded feels, listed by date: \n".format(user=userIndex[choice]))
-        view_feels(userIndex[choice])
-        view_neighbors(users, prompt, page)
-    else:
-        redraw()
-        return
+        if ans is not False:
+            (page, choice) = ans
+            redraw("~{user}'s recorded feels, listed by date: \n".format(user=userIndex[choice]))
+            view_feels(userIndex[choice])
+        else:
+            redraw()
+            return
 
 def view_feels(townie):
     '''
@@ -826,51 +914,64 @@ def view_feels(townie):
     metas, owner = generate_feels_list(townie)
 
     if len(metas) > 0:
-        entries = []
-        for entry in metas:
-            pub = ""
-            if core.nopub(entry[0]):
-                pub = "(nopub)"
-            entries.append(""+entry[4]+" ("+p.no("word", entry[2])+") "+"\t"+pub)
+        entries = lazylist.LazyList(metas, feels_label)
 
         return list_entries(metas, entries, owner+" recorded feels, listed by date: ")
     else:
         redraw("no feels recorded by ~"+townie)
 
+def feels_label(entry):
+    '''
+    formats a row of entry metadata for display in a feels list
+    '''
+
+    pub = ""
+    if core.nopub(entry[0]):
+        pub = "(nopub)"
+
+    return ""+entry[4]+" ("+p.no("word", entry[2])+") "+"\t"+pub
+
 def generate_feels_list(user):
     """create a list of feels for display from the named user.
+
+    the list is sorted newest first by the dates in the filenames, which
+    doesn't touch any of the files; each entry's metadata is only read when
+    its row is first displayed (see lazylist.LazyList).
     """
 
     filenames = []
-    showpub = False
 
     if user == config.USER:
         entryDir = config.MAIN_FEELS
         owner = "your"
-        if core.publishing():
-            showpub = True
     else:
         owner = "~"+user+"'s"
         entryDir = os.path.join("/home", user, ".ttbp", "entries")
 
-    for entry in os.listdir(entryDir):
-        filenames.append(os.path.join(entryDir, entry))
-    metas = core.meta(filenames)
-    metas.sort(key = lambda entry:entry[4])
-    metas.reverse()
+    for found in scanner.matches(entryDir):
+        filenames.append(found.path)
+    filenames.sort(key = os.path.basename, reverse = True)
 
-    return metas, owner
+    return lazylist.LazyList(filenames, core.entry_meta), owner
 
 def backup_feels():
-    """creates a tar.gz of user's entries directory"""
+    """creates a tar.gz of user's entries directory
 
-    backupfile = os.path.join(os.path.expanduser('~'), "feels-backup-"+time.strftime("%Y%m%d-%H%M%S")+".tar.gz")
+    if there's been a backup before, offers to only back up what's new or
+    changed since then"""
 
-    print("""\
-i'm preparing all of your entries for backup.""")
+    incremental = False
 
-    print("...")
-    time.sleep(1)
+    if backup.load_manifest():
+        incremental = util.input_yn("""\
+you've made a backup before! i can make a smaller backup with just the
+entries you've written or changed since your last one.
+
+would you like an incremental backup?
+
+please enter""")
+
+    backupfile = os.path.join(os.path.expanduser('~'), backup.backup_name(incremental))
 
     print("""
 ready to go! a backup file will be saved to your home directory at:
@@ -883,15 +984,21 @@ would you like to create this backup?
 please enter""")
 
     if ans:
-        if not subprocess.call(["tar", "-C", config.PATH, "-czf", backupfile, "entries"]):
-            subprocess.call(["chmod", "600", backupfile])
-            if not os.path.exists(config.BACKUPS):
-                subprocess.call(["mkdir", config.BACKUPS])
-            subprocess.call(["chmod", "700", config.BACKUPS])
-            subprocess.call(["cp", backupfile, config.BACKUPS])
-            print("\nbackup saved! i also put a copy at {backup_dir} for you.".format(backup_dir = config.BACKUPS))
-        else:
+        print("\ni'm preparing your entries for backup...")
+        count = backup.create(backupfile, incremental)
+        if count is None:
             print(config.mystery_error)
+        elif not count:
+            print("\nnothing's changed since your last backup, so there's nothing new to save!")
+        elif backup.keep(backupfile):
+            print("\nbackup of {count} {entries} saved! i also put a copy at {backup_dir} for you.".format(
+                count=count,
+                entries="entry" if count == 1 else "entries",
+                backup_dir=config.BACKUPS))
+        else:
+            print("\nbackup of {count} {entries} saved!".format(
+                count=count,
+                entries="entry" if count == 1 else "entries"))
     else:
         print("no problem, {friend}; come back whenever if you want a backup!".format(friend=chatter.say("friend")))
 
@@ -903,56 +1010,62 @@ please enter""")
 def delete_feels():
     """handles deleting feels one at a time"""
 
-    feel = input("""which day's feels do you want to load for deletion?
+    while True:
+        feel = input("""which day's feels do you want to load for deletion? you can also
+delete a bunch at once by giving a month, a year, a range like
+20160301-20160315, or a list of dates.
 
 YYYYMMDD (or 'q' to cancel)> """)
 
-    if feel in util.BACKS:
-        return
+        if feel in util.BACKS:
+            return
 
-    print("...")
-    time.sleep(0.1)
-    print("""\
+        if not (feel.isdigit() and len(feel) == 8):
+            return batch_feels(feel, "delete")
+
+        print("...")
+        time.sleep(0.1)
+        print("""\
 here's a preview of that feel. press <q> when you're done reviewing!
 -------------------------------------------------------------""")
 
-    if subprocess.call(["less", os.path.join(config.MAIN_FEELS, feel+".txt")]):
-        redraw("deleting feels")
-        print("""\
+        if subprocess.call(["less", os.path.join(config.MAIN_FEELS, feel+".txt")]):
+            redraw("deleting feels")
+            print("""\
 sorry, i couldn't find feels for {date}!
 
 please try again, or type <q> to cancel.
 """.format(date=feel))
-        return delete_feels()
+            continue
 
-    print("""
+        print("""
 -------------------------------------------------------------
 
 feels deletion is irreversible! if you're sure you want to delete this feel,
 type the date again to confirm, or 'q' to cancel.""")
 
-    confirm = input("[{feeldate}]> ".format(feeldate=feel))
+        confirm = input("[{feeldate}]> ".format(feeldate=feel))
 
-    if confirm == feel:
-        print("...")
-        time.sleep(0.5)
-        core.delete_feel(feel+".txt")
-        print("feels deleted!")
-    else:
-        print("deletion canceled!")
+        if confirm == feel:
+            print("...")
+            time.sleep(0.5)
+            core.delete_feel(feel+".txt")
+            print("feels deleted!")
+        else:
+            print("deletion canceled!")
 
-    ans = util.input_yn("""do you want to delete a different feel?
+        ans = util.input_yn("""do you want to delete a different feel?
 please enter""")
 
-    if ans:
-        redraw("deleting feels")
-        return delete_feels()
-    else:
-        print("okay! please come back any time if you want to delete old feels!")
-        input("\n\npress <enter> to go back to managing your feels.\n\n")
-        redraw()
+        if ans:
+            redraw("deleting feels")
+            continue
+        else:
+            print("okay! please come back any time if you want to delete old feels!")
+            input("\n\npress <enter> to go back to managing your feels.\n\n")
+            redraw()
 
-    return
+        return
 
 
 def purge_feels():
@@ -988,8 +1101,8 @@ type the following purge code:
             time.sleep(0.5)
             unpublish()
 
-            if not subprocess.call(["rm", "-rf", config.MAIN_FEELS]):
-                subprocess.call(["mkdir", config.MAIN_FEELS])
+            if fsops.remove_tree(config.MAIN_FEELS):
+                fsops.make_dir(config.MAIN_FEELS)
                 core.load_files()
                 print("ALL FEELS PURGED! you're ready to start fresh!")
             else:
@@ -1037,7 +1150,8 @@ purge code:
             make_publish_dir(publishDir)
 
 
-        if not subprocess.call(["rm", "-rf", config.PATH]):
+        if fsops.remove_tree(config.PATH):
+            core.discard_publish()
             print("""
 account deleted! if you ever want to come back, you're always welcome to start
 fresh :)
@@ -1073,7 +1187,7 @@ def load_backup():
             if "feels-backup" in filename and ".tar" in filename:
                 backups.append(filename)
     except FileNotFoundError:
-        subprocess.call(["mkdir", config.BACKUPS])
+        fsops.make_dir(config.BACKUPS)
 
     if len(backups) < 1:
         print("""
@@ -1086,22 +1200,24 @@ move it to {directory} and try running this tool again.\
 
         if ans is not False:
             (page, choice) = ans
-            imports = core.process_backup(os.path.join(config.BACKUPS, backups[choice]))
-            for feel in imports:
-                print("importing {entry}".format(entry="-".join(util.parse_date(feel))))
-                subprocess.call(["mv", feel, config.MAIN_FEELS])
-                time.sleep(.01)
+            print("importing feels from {backup}...".format(backup=backups[choice]))
+            imported = core.import_feels(core.process_backup(os.path.join(config.BACKUPS, backups[choice])))
 
-            core.load_files()
+            tempdir = core.IMPORT_STATS.get("leftover dir")
 
-            tempdir = os.path.join(config.BACKUPS, os.path.splitext(os.path.splitext(os.path.basename(backups[choice]))[0])[0], "entries")
-
-            time.sleep(.5)
             print("...\n")
 
-            if len(os.listdir(tempdir)) == 0:
-                os.rmdir(tempdir)
-                print("congrats! your feels archive has been unloaded.")
+            if imported:
+                print("imported {count} {feels}!".format(count=imported, feels="feel" if imported == 1 else "feels"))
+            if core.IMPORT_STATS.get("duplicates"):
+                print("skipped {count} that you already have.".format(count=core.IMPORT_STATS["duplicates"]))
+
+            if core.IMPORT_STATS.get("failed"):
+                print(config.mystery_error)
+
+            if not core.IMPORT_STATS.get("leftovers"):
+                if not core.IMPORT_STATS.get("failed"):
+                    print("congrats! your feels archive has been unloaded.")
             else:
                 print("""\
 i've unloaded as much as i can, but there are still some feels i didn't copy
@@ -1121,52 +1237,96 @@ def bury_feels():
     """queries for a feel to bury, then calls the feels burying handler.
     """
 
-    feel = input(config.bury_feels_prompt)
+    while True:
+        feel = input(config.bury_feels_prompt)
 
-    if feel in util.BACKS:
-        return
+        if feel in util.BACKS:
+            return
 
-    print("...")
-    time.sleep(0.1)
-    print("""\
+        if not (feel.isdigit() and len(feel) == 8):
+            return batch_feels(feel, "bury")
+
+        print("...")
+        time.sleep(0.1)
+        print("""\
 here's a preview of that feel. press <q> when you're done reviewing!
 -------------------------------------------------------------""")
 
-    if subprocess.call(["less", os.path.join(config.MAIN_FEELS, feel+".txt")]):
-        redraw("burying feels")
-        print("""\
+        if subprocess.call(["less", os.path.join(config.MAIN_FEELS, feel+".txt")]):
+            redraw("burying feels")
+            print("""\
 sorry, i couldn't find feels for {date}!
 
 please try again, or type <q> to cancel.
 """.format(date=feel))
-        return delete_feels()
+            continue
 
-    print("""
+        print("""
 -------------------------------------------------------------
 
 feels burying is irreversible! if you're sure you want to bury this feel,
 type the date again to confirm, or 'q' to cancel.
 """)
 
-    confirm = input("[{feeldate}]> ".format(feeldate=feel))
+        confirm = input("[{feeldate}]> ".format(feeldate=feel))
 
-    if confirm == feel:
-        print("...")
-        time.sleep(0.5)
-        core.bury_feel(feel+".txt")
-        print("feels buried!")
-    else:
-        print("burying canceled!")
+        if confirm == feel:
+            print("...")
+            time.sleep(0.5)
+            core.bury_feel(feel+".txt")
+            print("feels buried!")
+        else:
+            print("burying canceled!")
 
-    ans = util.input_yn("""do you want to bury a different feel?  please enter""")
+        ans = util.input_yn("""do you want to bury a different feel?  please enter""")
 
-    if ans:
-        redraw("burying feels")
-        return bury_feels()
+        if ans:
+            redraw("burying feels")
+            continue
+        else:
+            print("okay! please come back any time if you want to bury your feels!")
+            input("\n\npress <enter> to go back to managing your feels.\n\n")
+            redraw()
+
+        return
+
+def batch_feels(spec, action):
+    """handles burying or deleting every feel matching a date selection at once;
+    action is either "bury" or "delete"
+    """
+
+    selected = core.match_entries(spec)
+
+    if selected is None:
+        print("\nsorry, i didn't understand '{spec}'!".format(spec=spec))
+    elif not selected:
+        print("\nyou don't have any feels matching '{spec}'.".format(spec=spec))
     else:
-        print("okay! please come back any time if you want to bury your feels!")
-        input("\n\npress <enter> to go back to managing your feels.\n\n")
-        redraw()
+        print("\nthat matches {count}:\n".format(count=p.no("feel", len(selected))))
+        for line in range(0, len(selected), 6):
+            print("    "+"  ".join("-".join(util.parse_date(entry)) for entry in selected[line:line+6]))
+
+        print("""
+feels {action} is irreversible! if you're sure you want to {verb} all of these,
+type the number of feels to confirm, or anything else to cancel.""".format(
+            action="burying" if action == "bury" else "deletion",
+            verb=action))
+
+        confirm = input("[{count}]> ".format(count=len(selected)))
+
+        if confirm == str(len(selected)):
+            print("...")
+            if action == "bury":
+                done = core.bury_feels(selected)
+                print("{count} buried!".format(count=p.no("feel", len(done))))
+            else:
+                done = core.delete_feels(selected)
+                print("{count} deleted!".format(count=p.no("feel", len(done))))
+        else:
+            print("{action} canceled!".format(action="burying" if action == "bury" else "deletion"))
+
+    input("\n\npress <enter> to go back to managing your feels.\n\n")
+    redraw()
 
     return
 
@@ -1204,14 +1364,12 @@ def write_entry(entry=os.path.join(config.MAIN_FEELS, "test.txt")):
         core.toggle_nopub(os.path.basename(entry))
     else:
         if core.publishing():
-            core.write_html("index.html")
             left = "posted to {url}/index.html\n\n> ".format(
                 url="/".join(
                     [config.LIVE+config.USER,
                         str(SETTINGS.get("publish dir"))]))
 
         if SETTINGS.get('gopher'):
-            gopher.publish_gopher('feels', core.FILES)
             left += "also posted to your ~/public_gopher!\n\n> "
 
     #core.load_files()
@@ -1231,41 +1389,80 @@ def list_nopubs(user):
     else:
         redraw("no feels recorded by ~"+user)
 
+def bulk_nopubs():
+    """handler for setting pub/nopub on a batch of entries at once, picked by
+    date range or pattern
+    """
+
+    print("""\
+pick the feels you'd like to change, by date. you can give:
+
+    * a day, month, or year:          20160314, 201603, 2016
+    * a range between two of those:   2016-2017, 20160301-20160315
+    * a pattern:                      2016*01 (every first of the month)
+
+you can list more than one, separated by spaces or commas.
+""")
+
+    spec = input("which feels? (leave blank to cancel) ")
+
+    if spec:
+        selected = core.match_entries(spec)
+
+        if selected is None:
+            print("\nsorry, i didn't understand '{spec}'!".format(spec=spec))
+        elif not selected:
+            print("\nyou don't have any feels matching '{spec}'.".format(spec=spec))
+        else:
+            hidden = len([entry for entry in selected if core.nopub(entry)])
+
+            print("""
+that's {count}, from {first} to {last}; {hidden} of them {are} currently nopub.
+""".format(count=p.no("feel", len(selected)),
+                first="-".join(util.parse_date(selected[0])),
+                last="-".join(util.parse_date(selected[-1])),
+                hidden=hidden,
+                are=p.plural_verb("is", hidden)))
+
+            ans = input("type 'nopub' to hide them all, 'pub' to publish them all, or anything else to cancel: ")
+
+            if ans in ["nopub", "pub"]:
+                changed = core.set_nopub(selected, ans == "nopub")
+                print("\n{count} set to {status}!".format(count=p.no("feel", len(changed)), status=ans))
+            else:
+                print("\nokay, i left those feels alone.")
+
+        input("\n\npress <enter> to go back to managing your feels.\n\n")
+
+    redraw()
+
 def set_nopubs(metas, user, prompt, page=0):
     """displays a list of entries for pub/nopub toggling.
     """
 
-    if core.publishing():
-        nopub_note = ""
-    else:
-        nopub_note = """\
+    while True:
+        if core.publishing():
+            nopub_note = ""
+        else:
+            nopub_note = """\
 (since you're not publishing your entries, these settings don't really matter;
 none of your feels will be viewable outside of this server)"""
-        print(nopub_note + "\n")
-
-    entries = []
-    for entry in metas:
-        pub = ""
-        if core.nopub(entry[0]):
-            pub = "(nopub)"
-        entries.append(""+entry[4]+" ("+p.no("word", entry[2])+") "+"\t"+pub)
+            print(nopub_note + "\n")
 
-    ans = menu_handler(entries, "pick an entry from the list to toggle nopub status, or type 'q' to go back: ", 10, page, SETTINGS.get("rainbows", False), prompt+"\n\n"+nopub_note)
+        # rebuilt each time around, since the nopub markers change
+        entries = lazylist.LazyList(metas, feels_label)
 
-    if ans is not False:
-        (page, choice) = ans
-        target = os.path.basename(metas[choice][0])
-        action = core.toggle_nopub(target)
-        redraw(prompt)
+        ans = menu_handler(entries, "pick an entry from the list to toggle nopub status, or type 'q' to go back: ", 10, page, SETTINGS.get("rainbows", False), prompt+"\n\n"+nopub_note)
 
-        if SETTINGS["gopher"]:
-            gopher.publish_gopher('feels', core.get_files())
-
-        return set_nopubs(metas, user, prompt, page)
+        if ans is not False:
+            (page, choice) = ans
+            target = os.path.basename(metas[choice][0])
+            action = core.toggle_nopub(target)
+            redraw(prompt)
 
-    else:
-        redraw()
-        return
+        else:
+            redraw()
+            return
 
 def send_feedback(entered, subject="none"):
     '''
@@ -1310,21 +1507,20 @@ def list_entries(metas, entries, prompt, page=0):
     one for display.
     '''
 
-    ans = menu_handler(entries, "pick an entry from the list, or type 'q' to go back: ", 10, page, SETTINGS.get("rainbows", False), prompt)
+    while True:
+        ans = menu_handler(entries, "pick an entry from the list, or type 'q' to go back: ", 10, page, SETTINGS.get("rainbows", False), prompt)
 
-    if ans is not False:
-        (page, choice) = ans
-        redraw("now reading ~{user}'s feels on {date}\n> press <q> to return to feels list.\n\n".format(user=metas[choice][5],
-                    date=metas[choice][4]))
-
-        show_entry(metas[choice][0])
-        redraw(prompt)
+        if ans is not False:
+            (page, choice) = ans
+            redraw("now reading ~{user}'s feels on {date}\n> press <q> to return to feels list.\n\n".format(user=metas[choice][5],
+                        date=metas[choice][4]))
 
-        return list_entries(metas, entries, prompt, page)
+            show_entry(metas[choice][0])
+            redraw(prompt)
 
-    else:
-        redraw()
-        return
+        else:
+            redraw()
+            return
 
 def show_entry(filename):
     '''
@@ -1338,10 +1534,20 @@ def show_entry(filename):
 def view_global_feed():
     '''
     display list of most recent global entries
+
+    * the feed is read by feed.FeedStream, so the first page shows up as soon
+      as the most recent entries are known, and the rest fills in while it's
+      on screen; the scan is stopped once the feed is closed
     '''
 
-    (entries, metas)= feed_list(core.find_ttbps())
-    list_entries(metas, entries, "recent global entries:")
+    stream = feed.FeedStream(core.find_ttbps(), townie_candidates)
+    metas = lazylist.LazyList(stream, feed_meta)
+    entries = lazylist.LazyList(metas, feed_label)
+
+    try:
+        list_entries(metas, entries, "recent global entries:")
+    finally:
+        stream.stop()
     redraw()
 
     return
@@ -1362,51 +1568,81 @@ def feed_list(townies, delta=30):
     given interval (default 30 days; 0 days for no limit). validates against
     townies with ttbp config files.
 
+    candidates are streamed through a bounded heap keyed on mtime, so only the
+    entries that make it into the feed get read and word-counted.
+
     returns a tuple of (entries, metas)
     '''
 
-    feedList = []
-    all_users = core.find_ttbps()
+    metas = [feed_meta(found) for (mtime, found) in feed.newest(feed_candidates(townies, delta), feed.FEED_SIZE)]
+    entries = [feed_label(entry) for entry in metas]
+
+    return entries, metas
+
+def feed_meta(found):
+    '''
+    returns the metadata for an entry found for a feed, which is either a
+    feed index row or the path to an entry file
+    '''
+
+    if isinstance(found, list):
+        return feed.row_meta(found)
+
+    return core.entry_meta(found)
+
+def feed_label(entry):
+    '''
+    formats one entry's metadata as a feed list line
+    '''
+
+    pad = ""
+    if len(entry[5]) < 8:
+        pad = "\t"
+
+    return "~{user}{pad}\ton {date} ({wordcount})".format(
+            user=entry[5], pad=pad, date=entry[3],
+            wordcount=p.no("word", entry[2]))
+
+def feed_candidates(townies, delta=30):
+    '''
+    yields (mtime, entry) for every entry by the given townies within the given
+    interval (0 days for no limit), where entry is either a feed index row or
+    the path to an entry file that still needs its metadata read.
+    '''
+
+    all_users = core.ttbp_users()
 
     for townie in townies:
         if townie not in all_users:
             continue
 
-        entryDir = os.path.join("/home", townie, ".ttbp", "entries")
-        try:
-            filenames = os.listdir(entryDir)
-        except OSError:
-            filenames = []
-
-        for entry in filenames:
-            if delta > 0:
-                if core.valid(entry):
-                    year = int(entry[0:4])
-                    month = int(entry[4:6])
-                    day = int(entry[6:8])
-                    datecheck = datetime.date(year, month, day)
-                    displayCutoff = datetime.date.today() - datetime.timedelta(days=delta)
-
-                    if datecheck > displayCutoff:
-                        feedList.append(os.path.join(entryDir, entry))
-            else:
-                feedList.append(os.path.join(entryDir, entry))
+        for candidate in townie_candidates(townie, delta):
+            yield candidate
+
+def townie_candidates(townie, delta=30):
+    '''
+    yields (mtime, entry) for one townie's entries within the given interval,
+    as for feed_candidates().
 
-    metas = core.meta(feedList)
-    metas.sort(key = lambda entry:entry[3])
-    metas.reverse()
+    a current feed index is read if there is one; otherwise their entries
+    directory is scanned, with one stat per entry.
+    '''
 
-    entries = []
-    for entry in metas[0:50]:
-        pad = ""
-        if len(entry[5]) < 8:
-            pad = "\t"
+    displayCutoff = (datetime.date.today() - datetime.timedelta(days=delta)).strftime("%Y%m%d")
 
-        entries.append("~{user}{pad}\ton {date} ({wordcount})".format(
-                user=entry[5], pad=pad, date=entry[3],
-                wordcount=p.no("word", entry[2])))
+    ## use the townie's feed index if it's current
+    rows = feed.load_rows(townie)
+    if rows is not None:
+        for row in rows:
+            if delta > 0 and row[1] <= displayCutoff:
+                continue
+            yield (row[2], row)
+        return
 
-    return entries, metas
+    for entry in scanner.scan(os.path.join("/home", townie, ".ttbp", "entries")):
+        if delta > 0 and entry.date <= displayCutoff:
+            continue
+        yield (entry.stat.st_mtime, entry.path)
 
 def subscription_manager(subs, intro=""):
     '''
@@ -1417,47 +1653,47 @@ def subscription_manager(subs, intro=""):
             "remove pals"
             ]
 
-    util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
+    while True:
+        util.print_menu(menuOptions, SETTINGS.get("rainbows", False))
 
-    choice = util.list_select(menuOptions, "what do you want to do? (enter 'q' to go back) ")
+        choice = util.list_select(menuOptions, "what do you want to do? (enter 'q' to go back) ")
 
-    top = ""
+        top = ""
 
-    if choice is not False:
-        if choice == 0:
-            prompt = "list of townies recording feels:"
-            redraw(prompt)
-            subs = subscribe_handler(subs, prompt)
-        elif choice == 1:
-            prompt = "list of townies you're subscribed to:"
-            redraw(prompt)
-            subs = unsubscribe_handler(subs, prompt)
-    else:
-        redraw()
-        return
+        if choice is not False:
+            if choice == 0:
+                prompt = "list of townies recording feels:"
+                redraw(prompt)
+                subs = subscribe_handler(subs, prompt)
+            elif choice == 1:
+                prompt = "list of townies you're subscribed to:"
+                redraw(prompt)
+                subs = unsubscribe_handler(subs, prompt)
+        else:
+            redraw()
+            return
 
-    redraw(top+intro)
-    return subscription_manager(subs, intro)
+        redraw(top+intro)
 
 def unsubscribe_handler(subs, prompt, page=0):
     '''
     displays a list of currently subscribed users and toggles deletion.
     '''
 
-    subs.sort()
+    while True:
+        subs.sort()
 
-    ans = menu_handler(subs, "pick a pal to unsubscribe (or 'q' to cancel): ", 15, page, SETTINGS.get("rainbows", False), "list of townies recording feels:")
+        ans = menu_handler(subs, "pick a pal to unsubscribe (or 'q' to cancel): ", 15, page, SETTINGS.get("rainbows", False), "list of townies recording feels:")
 
-    if ans is not False:
-        (page,choice) = ans
-        townie = subs[choice]
-        subs.remove(townie)
-        save_subs(subs)
-        redraw("{townie} removed! \n\n> {prompt}".format(townie=townie, prompt=prompt))
-        return unsubscribe_handler(subs, prompt, page)
-    else:
-        redraw()
-        return subs
+        if ans is not False:
+            (page,choice) = ans
+            townie = subs[choice]
+            subs.remove(townie)
+            save_subs(subs)
+            redraw("{townie} removed! \n\n> {prompt}".format(townie=townie, prompt=prompt))
+        else:
+            redraw()
+            return subs
 
 def subscribe_handler(subs, prompt, page=0):
     '''
@@ -1465,26 +1701,20 @@ def subscribe_handler(subs, prompt, page=0):
     returning the subs list when finished.
     '''
 
-    candidates = []
-
-    for townie in core.find_ttbps():
-        if townie not in subs:
-            candidates.append(townie)
-
-    candidates.sort()
+    while True:
+        candidates = sorted(core.ttbp_users().difference(subs))
 
-    ans = menu_handler(candidates, "pick a townie to add to your subscriptions (or 'q' to cancel): ", 15, page, SETTINGS.get("rainbows", False), "list of townies recording feels:")
+        ans = menu_handler(candidates, "pick a townie to add to your subscriptions (or 'q' to cancel): ", 15, page, SETTINGS.get("rainbows", False), "list of townies recording feels:")
 
-    if ans is not False:
-        (page, choice) = ans
-        townie = candidates[choice]
-        subs.append(townie)
-        save_subs(subs)
-        redraw("{townie} added! \n\n> {prompt}".format(townie=townie, prompt=prompt))
-        return subscribe_handler(subs, prompt, page)
-    else:
-        redraw()
-        return subs
+        if ans is not False:
+            (page, choice) = ans
+            townie = candidates[choice]
+            subs.append(townie)
+            save_subs(subs)
+            redraw("{townie} added! \n\n> {prompt}".format(townie=townie, prompt=prompt))
+        else:
+            redraw()
+            return subs
 
 def save_subs(subs):
     '''
@@ -1508,7 +1738,7 @@ def graffiti_handler():
             time.time() - os.path.getmtime(config.WALL_LOCK) < 60*60*24*3:
         redraw("sorry, {friend}, but someone's there right now. try again in a few!".format(friend=chatter.say("friend")))
     else:
-        subprocess.call(["touch", config.WALL_LOCK])
+        fsops.touch(config.WALL_LOCK)
         redraw()
         print("""\
 the graffiti wall is a world-writeable text file. anyone can
@@ -1523,7 +1753,7 @@ your changes by exiting without saving.
 """)
         input("press <enter> to visit the wall\n\n")
         subprocess.call([SETTINGS.get("editor"), config.WALL])
-        subprocess.call(["rm", config.WALL_LOCK])
+        fsops.remove(config.WALL_LOCK)
         redraw("thanks for visiting the graffiti wall!")
 
 
@@ -1569,6 +1799,83 @@ please enter""")
     else:
         return SETTINGS.get("post as nopub")
 
+def toggle_background():
+    """setup helper for background publishing toggling
+    """
+
+    if SETTINGS.get("background publishing", False) is True:
+        status = "enabled"
+    else:
+        status = "disabled"
+
+    print("\nBACKGROUND PUBLISHING")
+    print("background publishing is currently {status}".format(status=status))
+
+    background = util.input_yn("""\
+
+with background publishing, your html and gopher pages get rebuilt while you
+keep using the menus, instead of making you wait after each post. this is
+handy if you have a lot of feels!
+
+would you like to publish in the background?
+
+please enter\
+""")
+
+    return background
+
+def toggle_shards():
+    """setup helper for gopher shard toggling
+    """
+
+    if SETTINGS.get("gopher shards", False) is True:
+        status = "enabled"
+    else:
+        status = "disabled"
+
+    print("\nGOPHER SHARDS")
+    print("gopher shards are currently {status}".format(status=status))
+
+    shards = util.input_yn("""\
+
+normally your gophermap lists every entry you've published on one page. with
+gopher shards, it lists your years instead, and each year lists its months,
+so a big phlog stays quick to browse and quick to update.
+
+would you like to shard your gophermap?
+
+please enter\
+""")
+
+    return shards
+
+def select_page_size():
+    """setup helper for index page size selection
+    """
+
+    current = SETTINGS.get("page size", 0)
+
+    print("\nINDEX PAGE SIZE")
+    if current:
+        print("your index is currently split into pages of {size} entries".format(size=current))
+    else:
+        print("your index currently shows every entry on one page")
+
+    print("""
+if you have a lot of feels, your index page can get pretty big! you can split
+it into pages of a set number of entries, with the newest ones on index.html.
+this also makes an archive page for each month.
+
+enter a page size, or 0 to keep everything on one page.""")
+
+    while True:
+        choice = input("\npage size (leave blank to keep {size}): ".format(size=current))
+        if not choice:
+            return current
+        if choice.isdigit():
+            return int(choice)
+        print("\nsorry, that needs to be a number!")
+
 def toggle_rainbows():
     """setup helper for rainbow toggling
     """
@@ -1676,13 +1983,16 @@ def unpublish():
 
     global SETTINGS
 
+    # don't let a background rebuild put anything back
+    core.wait_publish()
+
     directory = SETTINGS.get("publish dir")
 
     if directory:
         publishDir = os.path.join(config.PUBLIC, directory)
         if os.path.exists(publishDir):
-            subprocess.call(["rm", "-rf", publishDir])
-        subprocess.call(["rm", "-rf", config.WWW])
+            fsops.remove_tree(publishDir)
+        fsops.remove_tree(config.WWW)
         make_publish_dir(SETTINGS.get("publish dir"))
         #SETTINGS.update({"publish dir": None})
 
@@ -1701,7 +2011,7 @@ def update_publishing():
         newDir = select_publish_dir()
         SETTINGS.update({"publish dir": newDir})
         if oldDir:
-            subprocess.call(["rm", os.path.join(config.PUBLIC, oldDir)])
+            fsops.remove(os.path.join(config.PUBLIC, oldDir))
         make_publish_dir(newDir)
         core.load_files()
         #core.write_html("index.html")
@@ -1716,9 +2026,8 @@ def make_publish_dir(publish_dir):
     '''
 
     if not os.path.exists(config.WWW):
-        subprocess.call(["mkdir", config.WWW])
-        subprocess.call(["ln", "-s", os.path.join(config.USER_CONFIG, "style.css"), os.path.join(config.WWW, "style.css")])
-        subprocess.call(["touch", os.path.join(config.WWW, "index.html")])
+        fsops.make_dir(config.WWW)
+        fsops.symlink(os.path.join(config.USER_CONFIG, "style.css"), os.path.join(config.WWW, "style.css"))
         index = open(os.path.join(config.WWW, "index.html"), "w")
         index.write("<h1>ttbp blog placeholder</h1>")
         index.close()
@@ -1726,9 +2035,9 @@ def make_publish_dir(publish_dir):
     if core.publishing():
         live = os.path.join(config.PUBLIC, publish_dir)
         if os.path.exists(live):
-            subprocess.call(["rm", live])
+            fsops.remove(live)
 
-        subprocess.call(["ln", "-s", config.WWW, live])
+        fsops.symlink(config.WWW, live)
 
         return "\n\tpublishing to "+config.LIVE+config.USER+"/"+SETTINGS.get("publish dir")+"/\n\n"
 
@@ -1742,11 +2051,16 @@ def update_gopher():
     '''
     # TODO for now i'm hardcoding where people's gopher stuff is generated. if
     # there is demand for this to be configurable we can expose that.
+    # the gophermap itself is left to the publisher, which might be running
+    # in the background
+    core.wait_publish()
+    core.reload_ttbprc(SETTINGS)
+
     if SETTINGS.get("gopher"):
         gopher.setup_gopher('feels')
-        gopher.publish_gopher("feels", core.get_files())
+        core.request_publish(html=False)
     else:
-        subprocess.call(["rm", config.GOPHER_PATH])
+        fsops.remove(config.GOPHER_PATH)
     redraw("gopher publishing set to {gopher}".format(gopher=SETTINGS.get("gopher")))
 
 ##### PATCHING UTILITIES
@@ -1794,21 +2108,21 @@ def update_user_version():
         # change style.css location
         if core.publishing():
             if os.path.isfile(os.path.join(config.WWW, "style.css")):
-                subprocess.call(["mv", os.path.join(config.WWW, "style.css"), config.USER_CONFIG])
+                fsops.move(os.path.join(config.WWW, "style.css"), config.USER_CONFIG)
 
             # change www symlink
             if os.path.exists(config.WWW):
-                subprocess.call(["rm", config.WWW])
+                fsops.remove(config.WWW)
 
-            subprocess.call(["mkdir", config.WWW])
+            fsops.make_dir(config.WWW)
 
-            subprocess.call(["ln", "-s", os.path.join(config.USER_CONFIG, "style.css"), os.path.join(config.WWW, "style.css")])
+            fsops.symlink(os.path.join(config.USER_CONFIG, "style.css"), os.path.join(config.WWW, "style.css"))
 
             publishDir = os.path.join(config.PUBLIC, SETTINGS.get("publish dir"))
             if os.path.exists(publishDir):
-                subprocess.call(["rm", "-rf", publishDir])
+                fsops.remove_tree(publishDir)
 
-            subprocess.call(["ln", "-s", config.WWW, os.path.join(config.PUBLIC, SETTINGS.get("publish dir"))])
+            fsops.symlink(config.WWW, os.path.join(config.PUBLIC, SETTINGS.get("publish dir")))
 
             # repopulate html files
             core.load_files()
@@ -23,7 +23,10 @@ LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
 OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 '''
+import fnmatch
 import random
+import re
+import tempfile
 import time
 from six.moves import input
 import os
@@ -35,6 +38,14 @@ import inflect
 BACKS = ['back', 'b', 'q', '<q>']
 NAVS = ['u', 'd']
 
+# the process umask, read once at import (reading it means setting it, which
+# isn't safe once the background publisher is running)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# control characters that `wc -w` treats as neither word nor space
+NONPRINTING = re.compile(u"[\x00-\x08\x0e-\x1f\x7f-\x9f\u2028\u2029]")
+
 ## color stuff
 colorama.init()
 textcolors = [ colorama.Fore.RED, colorama.Fore.GREEN, colorama.Fore.YELLOW, colorama.Fore.BLUE, colorama.Fore.MAGENTA, colorama.Fore.WHITE, colorama.Fore.CYAN]
@@ -178,28 +189,26 @@ def list_select(options, prompt):
     ValueError or IndexError.
     '''
 
-    ans = ""
-    invalid = True
+    while True:
+        choice = input("\n"+prompt)
 
-    choice = input("\n"+prompt)
+        if choice in BACKS:
+            return False
 
-    if choice in BACKS:
-        return False
+        if choice in NAVS:
+            return choice
 
-    if choice in NAVS:
-        return choice
+        try:
+            ans = int(choice)
+        except ValueError:
+            continue
 
-    try:
-        ans = int(choice)
-    except ValueError:
-        return list_select(options, prompt)
-
-    try:
-        options[ans]
-    except IndexError:
-        return list_select(options, prompt)
+        try:
+            options[ans]
+        except IndexError:
+            continue
 
-    return ans
+        return ans
 
 def input_yn(query):
     '''
@@ -233,3 +242,106 @@ def parse_date(file):
 
     return date
 
+def select_dates(spec, filenames):
+    '''
+    picks out the entries matching a date selection
+
+    * spec is one or more terms, separated by commas or spaces; each term is
+      one of:
+      - a date or partial date: 20160314, 2016-03-14, 201603, 2016-03, 2016
+      - a range of those: 2016-2017, 20160301-20160315
+      - a glob on YYYYMMDD: 2016*01, 201?1225
+    * returns the matching filenames, sorted, or None if spec doesn't parse
+      (including a range that ends before it starts)
+    '''
+
+    terms = spec.replace(",", " ").split()
+
+    if not terms:
+        return None
+
+    tests = []
+
+    for term in terms:
+        if "*" in term or "?" in term or "[" in term:
+            tests.append(lambda date, term=term: fnmatch.fnmatchcase(date, term))
+            continue
+
+        bounds = term.split("-")
+        if len(bounds) == 3:
+            bounds = ["".join(bounds)]
+        elif len(bounds) == 2 and len(bounds[0]) == 4 and 1 <= len(bounds[1]) <= 2:
+            # YYYY-MM is a month, not a range
+            bounds = [bounds[0]+bounds[1].zfill(2)]
+
+        if len(bounds) > 2 or not all(bound.isdigit() and len(bound) <= 8 for bound in bounds):
+            return None
+
+        start = bounds[0].ljust(8, "0")
+        end = bounds[-1].ljust(8, "9")
+        if start > end:
+            return None
+
+        tests.append(lambda date, start=start, end=end: start <= date <= end)
+
+    selected = []
+    for filename in filenames:
+        date = os.path.splitext(os.path.basename(filename))[0]
+        if any(test(date) for test in tests):
+            selected.append(filename)
+
+    selected.sort()
+
+    return selected
+
+def word_count(text):
+    '''
+    counts words the same way `wc -w` does
+
+    * takes either a string or raw bytes, which are decoded as utf-8; bytes
+      that aren't valid utf-8 are dropped, since wc counts them as neither
+      word nor space
+    '''
+
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", "ignore")
+
+    if NONPRINTING.search(text):
+        text = NONPRINTING.sub(u"", text)
+
+    return len(text.split())
+
+def write_atomic(path, chunks, binary=False):
+    '''
+    writes a list of strings out to the given path in a single write
+
+    * writes to a temp file next to path and renames it into place, so anyone
+      reading path never sees a half-written file
+    * the temp file is made with mkstemp, so its name can't be guessed ahead
+      of time and two threads never share one
+    * path keeps its permissions if it already exists; a new file gets the
+      usual permissions for the umask
+    * with binary set, chunks are bytes instead of strings
+    '''
+
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~UMASK
+
+    handle, temp = tempfile.mkstemp(prefix="."+os.path.basename(path)+".",
+            suffix=".tmp", dir=os.path.dirname(path) or ".")
+
+    try:
+        os.fchmod(handle, mode)
+        if binary:
+            with os.fdopen(handle, "wb") as outfile:
+                outfile.write(b"".join(chunks))
+        else:
+            with os.fdopen(handle, "w") as outfile:
+                outfile.write("".join(chunks))
+        os.replace(temp, path)
+    except Exception:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise